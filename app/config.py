@@ -10,6 +10,177 @@ class Settings(BaseSettings):
 
     app_name: str = "Company Research Report Generator"
 
+    # Research fan-out: deadline per source and for the whole report
+    source_timeout_seconds: float = 20.0
+    report_budget_seconds: float = 45.0
+
+    # Shared outbound HTTP pool (created once per app lifetime)
+    http2: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 40
+    http_keepalive_expiry_seconds: float = 30.0
+    http_max_connections_per_host: int = 8
+    http_max_concurrency: int = 64
+    http_user_agent: str = "company-research-tool/1.0 (+https://github.com/Kiriill/company_research_tool)"
+
+    # Per-host protection (GET /upstreams/status shows the live state).
+    # Token bucket: rate per second with a burst of rate x burst_seconds; a call
+    # that would wait longer than max_wait fails at once instead of queueing.
+    # The rate halves when a host throttles (429, 503 + Retry-After) and
+    # recovers on success. Circuit breaker: opens after failure_threshold
+    # consecutive failures (or on throttling) for the cooldown, doubled after
+    # each failed half-open probe up to the max; open circuits fail in
+    # microseconds. Concurrency adapts between 1 and http_max_connections_per_host,
+    # backing off when recent latency exceeds adaptive_latency_tolerance x its
+    # long-term average.
+    resilience_enabled: bool = True
+    resilience_max_hosts: int = 1024
+    host_rate_per_second: float = 20.0
+    host_rate_burst_seconds: float = 2.0
+    host_rate_max_wait_seconds: float = 2.0
+    host_rate_min_per_second: float = 0.2
+    host_rate_overrides: dict[str, float] = {"duckduckgo.com": 3.0}
+    # Every report and batch lookup goes through the Wikimedia APIs: queue for
+    # them (within the source timeout) rather than fail a burst at once
+    host_rate_max_wait_overrides: dict[str, float] = {
+        "en.wikipedia.org": 15.0,
+        "www.wikidata.org": 15.0,
+        "query.wikidata.org": 15.0,
+    }
+    breaker_failure_threshold: int = 5
+    breaker_cooldown_seconds: float = 15.0
+    breaker_max_cooldown_seconds: float = 300.0
+    adaptive_latency_tolerance: float = 2.0
+
+    # Upstream endpoints
+    wikipedia_api_url: str = "https://en.wikipedia.org/w/api.php"
+    wikidata_api_url: str = "https://www.wikidata.org/w/api.php"
+    wikidata_sparql_url: str = "https://query.wikidata.org/sparql"
+    wikidata_timeout_seconds: float = 15.0
+    newsapi_url: str = "https://newsapi.org/v2/everything"
+
+    # Company resolution: local title index seeded from a JSONL dump and past
+    # choices; remote search only when the local ranking has no clear winner.
+    # Remote hits are ranked per query, never added to the shared index.
+    title_index_seed_path: str | None = None
+    # Past choices kept in the history log (compacted at startup)
+    resolve_history_max_entries: int = 10000
+    resolve_margin: float = 0.15
+    resolve_min_score: float = 0.3
+
+    # Finance: bundled company-name -> ticker mapping
+    symbol_table_path: str = "app/data/symbols.csv"
+
+    # Worker pools for blocking libraries and CPU-bound extraction/parsing.
+    # cpu_pool_processes=0 keeps CPU work on the thread pool.
+    blocking_io_threads: int = 16
+    cpu_pool_processes: int = 0
+
+    # LLM research: search/page fetch fan-out and early stop once enough
+    # substantial documents (>= llm_min_doc_chars) have been extracted
+    llm_search_concurrency: int = 4
+    llm_fetch_concurrency: int = 6
+    llm_page_timeout_seconds: float = 8.0
+    llm_target_docs: int = 8
+    llm_min_doc_chars: int = 1500
+
+    # LLM client; openai_base_url points at any OpenAI-compatible server
+    openai_base_url: str | None = None
+    llm_model: str = "gpt-4o-mini"
+    llm_timeout_seconds: float = 90.0
+
+    # "single" asks for the whole report in one streamed completion; "sections"
+    # runs one concurrent completion per report section, with retries and a
+    # per-call timeout, sharing the same context token budget between them
+    llm_mode: str = "single"
+    llm_section_concurrency: int = 4
+    llm_section_attempts: int = 2
+    llm_section_timeout_seconds: float = 30.0
+
+    # LLM context packing: token budget per expected page (clamped), chunk
+    # size, and MinHash similarity above which a chunk counts as a duplicate
+    llm_context_tokens_per_page: int = 1500
+    llm_context_min_tokens: int = 3000
+    llm_context_max_tokens: int = 16000
+    llm_chunk_tokens: int = 256
+    llm_dedupe_threshold: float = 0.8
+
+    # Batch reports: pipeline runs shared by all batches, name lookups per batch
+    batch_concurrency: int = 4
+    batch_resolve_concurrency: int = 8
+    batch_max_items: int = 500
+
+    # Prometheus metrics and per-report stage timings
+    metrics_enabled: bool = True
+
+    # Heavy libraries (yfinance/pandas, openai, trafilatura, ...) load on first
+    # use; warm_up_sources preloads what the enabled sources need in the
+    # background at startup. GET /diagnostics/imports (off by default: it is
+    # unauthenticated) runs a fresh interpreter with -X importtime per call,
+    # one at a time; calls made while one runs are turned away.
+    warm_up_sources: bool = False
+    diagnostics_enabled: bool = False
+
+    # Research cache: in-process LRU in front of an on-disk SQLite store.
+    # TTLs are per source namespace, in seconds.
+    cache_enabled: bool = True
+    cache_dir: str = ".cache"
+    cache_memory_entries: int = 512
+    cache_max_disk_mb: int = 256
+    cache_ttl_wikipedia: float = 86400.0
+    cache_ttl_finance: float = 86400.0
+    cache_ttl_news: float = 3600.0
+    cache_ttl_reviews: float = 43200.0
+    cache_ttl_website: float = 21600.0
+    cache_ttl_search: float = 21600.0
+    cache_ttl_resolve: float = 86400.0
+    cache_ttl_wikidata: float = 604800.0
+    # LLM completions, keyed by model, temperature, prompt and document content.
+    # llm_cache_reuse_sections also reuses a section across interests/page changes.
+    cache_ttl_llm: float = 604800.0
+    llm_cache_reuse_sections: bool = False
+    # Rendered PDFs: upper bound on lifetime (source expiry usually ends it sooner)
+    cache_ttl_report: float = 86400.0
+    # ... and for a report built while some source failed or timed out
+    cache_ttl_degraded_report: float = 600.0
+    # Page store: fetched HTML (compressed, by content hash) and extracted text.
+    # Freshness follows Cache-Control/Expires, clamped to floor..cap.
+    page_store_max_mb: int = 256
+    page_default_max_age_seconds: float = 21600.0
+    page_max_age_floor_seconds: float = 600.0
+    page_max_age_cap_seconds: float = 604800.0
+
+    # Report assets (logos, images in sections): prefetched during research,
+    # downscaled to asset_max_px on the longest side and re-encoded, cached,
+    # and handed to the render workers, which never fetch anything themselves
+    cache_ttl_asset: float = 604800.0
+    asset_max_px: int = 600
+    asset_jpeg_quality: int = 85
+    asset_max_bytes: int = 5_000_000
+    asset_max_per_report: int = 16
+    asset_timeout_seconds: float = 10.0
+
+    report_cache_max_mb: int = 512
+
+    # PDF rendering process pool (0 workers = one per available CPU, at most
+    # 4; spawned on demand). Requests beyond workers + queue size get 503 with
+    # Retry-After.
+    render_workers: int = 0
+    render_queue_size: int = 8
+    render_timeout_seconds: float = 60.0
+    render_retry_after_seconds: int = 5
+    # Background jobs and batch entries retry a busy renderer (the render step
+    # only) for at most this long, then fail
+    render_wait_max_seconds: float = 600.0
+    # Optional directory for compiled Jinja template bytecode
+    template_bytecode_cache_dir: str | None = None
+
+    # Background report jobs: "memory" or "sqlite" store, bounded workers/queue
+    job_store: str = "memory"
+    job_workers: int = 4
+    job_queue_size: int = 100
+    job_retention_seconds: float = 3600.0
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -1,20 +1,125 @@
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, Request, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from typing import List, Optional
+from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST
 from .config import settings
-from .services.resolve_company import search_companies
-from .services.assemble_report import assemble_company_report
-from .report.pdf import render_report_html, html_to_pdf
+from .models import BatchRequest, ReportRequest
+from .services.resolve_company import (autocomplete as autocomplete_titles, load_title_index,
+                                       record_resolution, search_companies)
+from .services.batch import ndjson_stream, parse_csv, run_batch, zip_stream
+from .services.pipeline import generate_report_pdf, stream_report
+from .services.report_cache import get_cached_report
+from .services.jobs import QueueFullError, job_manager
+from .services.diagnostics import DiagnosticsBusyError, allowed_modules, import_report
+from .report.pdf import RenderBusyError, RenderTimeoutError, init_renderer, shutdown_renderer
+from .sources import warm_up
+from .sources.llm import close_openai_client
+from .utils.http import init_http_client, close_http_client
+from .utils.metrics import render_latest
+from .utils.resilience import host_guards
+from .utils.workers import run_blocking, shutdown_workers
+import asyncio
 import io
+import json
+import re
+import time
 
-app = FastAPI(title="Company Research Report Generator")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_http_client()
+    load_title_index()
+    init_renderer()
+    await job_manager.start()
+    # Preload in the background: startup (and the health check) must not wait on it
+    warming = asyncio.ensure_future(run_blocking(warm_up)) if settings.warm_up_sources else None
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        await close_http_client()
+        await close_openai_client()
+        shutdown_workers()
+        shutdown_renderer()
+        if warming is not None:
+            warming.cancel()
+
+
+app = FastAPI(title="Company Research Report Generator", lifespan=lifespan)
 
 templates = Jinja2Templates(directory="app/report/templates")
 app.mount("/static", StaticFiles(directory="app/report/styles"), name="static")
 
 
+def _pdf_response(request: Request, pdf_bytes: bytes, filename: str, etag: str, expires_at: float) -> Response:
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"private, max-age={max(0, int(expires_at - time.time()))}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in {t.strip().strip('"').removeprefix('W/"') for t in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename={filename}.pdf"
+    return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+
+
+async def _report_pdf(request: Request,
+                      company_title: str,
+                      expected_pages: int,
+                      interests: Optional[str],
+                      reference_urls: List[str],
+                      filename: Optional[str] = None) -> Response:
+    report = await generate_report_pdf(company_title, expected_pages, interests, reference_urls, filename)
+    return _pdf_response(request, report.pdf, report.filename, report.etag, report.expires_at)
+
+
+@app.exception_handler(RenderBusyError)
+async def render_busy(request: Request, exc: RenderBusyError):
+    return Response(str(exc), status_code=503, media_type="text/plain",
+                    headers={"Retry-After": str(settings.render_retry_after_seconds)})
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full(request: Request, exc: QueueFullError):
+    return Response(str(exc), status_code=503, media_type="text/plain",
+                    headers={"Retry-After": str(settings.render_retry_after_seconds)})
+
+
+@app.exception_handler(RenderTimeoutError)
+async def render_timeout(request: Request, exc: RenderTimeoutError):
+    return Response(str(exc), status_code=504, media_type="text/plain")
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/upstreams/status")
+async def upstreams_status(state: Optional[str] = Query(None, pattern="^(closed|open|half_open)$")):
+    hosts = host_guards.status()
+    if state is not None:
+        hosts = {h: s for h, s in hosts.items() if s["state"] == state}
+    return {"enabled": settings.resilience_enabled, "hosts": hosts}
+
+
+@app.get("/diagnostics/imports")
+async def diagnostics_imports(module: str = "app.main", limit: int = Query(20, ge=1, le=200)):
+    if not settings.diagnostics_enabled:
+        raise HTTPException(status_code=404)
+    if module not in allowed_modules():
+        raise HTTPException(status_code=400, detail=f"module must be one of: {', '.join(allowed_modules())}")
+    try:
+        return await import_report(module, limit)
+    except DiagnosticsBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Import of {module} failed: {exc}")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     return templates.TemplateResponse("form.html.j2", {"request": request, "step": "input"})
@@ -38,16 +143,15 @@ async def resolve(request: Request,
     # If single high-confidence match, proceed directly
     if len(candidates) == 1 and candidates[0]["score"] >= 0.9:
         selection = candidates[0]
-        report_data = await assemble_company_report(
+        await record_resolution(selection["title"], company_name)
+        return await _report_pdf(
+            request,
             company_title=selection["title"],
             expected_pages=expected_pages,
             interests=interests,
             reference_urls=[u.strip() for u in (reference_urls or "").splitlines() if u.strip()],
+            filename=selection["slug"],
         )
-        html = render_report_html(report_data)
-        pdf_bytes = await html_to_pdf(html)
-        return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf",
-                                 headers={"Content-Disposition": f"attachment; filename={selection['slug']}.pdf"})
 
     # Otherwise show disambiguation choices
     return templates.TemplateResponse(
@@ -64,20 +168,116 @@ async def resolve(request: Request,
     )
 
 
+@app.get("/autocomplete")
+async def autocomplete(q: str = "", limit: int = 8):
+    return autocomplete_titles(q, min(max(limit, 1), 20)) if len(q.strip()) >= 2 else []
+
+
 @app.post("/generate")
 async def generate(request: Request,
                    selected_title: str = Form(...),
+                   company_name: Optional[str] = Form(None),
                    expected_pages: int = Form(4),
                    interests: Optional[str] = Form(""),
                    reference_urls: Optional[str] = Form("")):
-    report_data = await assemble_company_report(
+    await record_resolution(selected_title, company_name)
+    return await _report_pdf(
+        request,
         company_title=selected_title,
         expected_pages=expected_pages,
         interests=interests,
         reference_urls=[u.strip() for u in (reference_urls or "").splitlines() if u.strip()],
     )
-    html = render_report_html(report_data)
-    pdf_bytes = await html_to_pdf(html)
-    safe_slug = report_data.slug or selected_title.lower().replace(" ", "-")
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(body: ReportRequest):
+    job = await job_manager.submit(body)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "pdf_url": f"/jobs/{job.id}/pdf",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.model_dump(exclude={"key"})
+
+
+@app.get("/jobs/{job_id}/pdf")
+async def get_job_pdf(job_id: str):
+    job = await job_manager.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    pdf_bytes = await job_manager.store.get_result(job_id)
+    if pdf_bytes is None:
+        raise HTTPException(status_code=410, detail="Job result expired")
     return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf",
-                             headers={"Content-Disposition": f"attachment; filename={safe_slug}.pdf"})
\ No newline at end of file
+                             headers={"Content-Disposition": f"attachment; filename={job.filename}.pdf"})
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/reports/stream")
+async def stream_report_events(company_title: str,
+                               expected_pages: int = 4,
+                               interests: Optional[str] = None,
+                               reference_urls: List[str] = Query(default=[])):
+    # Server-Sent Events: stage/section events while researching, then
+    # "report" with the full data and "done" with the PDF location
+    async def events():
+        try:
+            async for event, data in stream_report(company_title, expected_pages, interests,
+                                                   [u.strip() for u in reference_urls if u.strip()]):
+                yield _sse(event, data)
+        except Exception as exc:
+            yield _sse("error", {"error": str(exc) or type(exc).__name__})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/reports/{key}/pdf")
+async def get_report_pdf(request: Request, key: str):
+    report = await get_cached_report(key) if re.fullmatch(r"[0-9a-f]{64}", key) else None
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return _pdf_response(request, report.pdf, report.filename, report.etag, report.expires_at)
+
+
+@app.post("/batch")
+async def batch(request: Request, format: str = "ndjson"):
+    # JSON BatchRequest, a text/csv body, or a multipart form with a CSV "file"
+    content_type = request.headers.get("content-type", "")
+    if "multipart/form-data" in content_type:
+        upload = (await request.form()).get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a CSV file in the 'file' field")
+        body = parse_csv((await upload.read()).decode("utf-8-sig"))
+    elif "csv" in content_type:
+        body = parse_csv((await request.body()).decode("utf-8-sig"))
+    else:
+        try:
+            body = BatchRequest.model_validate_json(await request.body())
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+    if not body.companies:
+        raise HTTPException(status_code=400, detail="No companies given")
+    if len(body.companies) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_items} companies per batch")
+
+    if format == "zip":
+        return StreamingResponse(zip_stream(run_batch(body)), media_type="application/zip",
+                                 headers={"Content-Disposition": "attachment; filename=reports.zip"})
+    if format != "ndjson":
+        raise HTTPException(status_code=400, detail="format must be ndjson or zip")
+    return StreamingResponse(ndjson_stream(run_batch(body)), media_type="application/x-ndjson")
\ No newline at end of file
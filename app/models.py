@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 
 
 class CompanySelection(BaseModel):
@@ -29,6 +29,7 @@ class ReportData(BaseModel):
     leaders: List[str] = Field(default_factory=list)
     products: List[str] = Field(default_factory=list)
     revenue: Optional[str] = None
+    revenue_history: List[Dict[str, Any]] = Field(default_factory=list)
 
     sections: List[ReportSection] = Field(default_factory=list)
     peers: List[str] = Field(default_factory=list)
@@ -36,4 +37,38 @@ class ReportData(BaseModel):
 
     references: List[str] = Field(default_factory=list)
 
-    meta: Dict[str, Any] = Field(default_factory=dict)
\ No newline at end of file
+    meta: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ReportRequest(BaseModel):
+    company_title: str
+    expected_pages: int = 4
+    interests: Optional[str] = None
+    reference_urls: List[str] = Field(default_factory=list)
+
+
+class BatchItem(BaseModel):
+    company: str
+    expected_pages: Optional[int] = None
+    interests: Optional[str] = None
+    reference_urls: List[str] = Field(default_factory=list)
+
+
+class BatchRequest(BaseModel):
+    companies: List[Union[str, BatchItem]]
+    # Defaults for entries that do not set their own
+    expected_pages: int = 4
+    interests: Optional[str] = None
+
+
+class Job(BaseModel):
+    id: str
+    key: str
+    request: ReportRequest
+    status: str = "queued"  # queued | running | done | failed
+    stage: str = "queued"
+    progress: float = 0.0
+    error: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: float
+    updated_at: float
\ No newline at end of file
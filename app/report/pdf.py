@@ -1,26 +1,177 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from weasyprint import HTML, CSS
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from ..config import settings
 from ..models import ReportData
+import asyncio
+import functools
+import multiprocessing
 import os
+import threading
 
+if TYPE_CHECKING:
+    from weasyprint import CSS
+    from ..utils.assets import Asset
+    from weasyprint.text.fonts import FontConfiguration
 
-def _env() -> Environment:
-    return Environment(
-        loader=FileSystemLoader("app/report/templates"),
-        autoescape=select_autoescape(["html", "xml"]),
-        trim_blocks=True,
-        lstrip_blocks=True,
-    )
+
+class RenderBusyError(Exception):
+    pass
+
+
+class RenderTimeoutError(Exception):
+    pass
+
+
+TEMPLATES_DIR = "app/report/templates"
+STYLESHEET_PATH = "app/report/styles/report.css"
+
+_pool: ProcessPoolExecutor | None = None
+# Default worker count ceiling: each worker holds its own WeasyPrint import
+_DEFAULT_MAX_WORKERS = 4
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_engine: "RenderEngine | None" = None
+
+# Per render-worker state, built once by _init_render_worker
+_stylesheet: "CSS | None" = None
+_font_config: "FontConfiguration | None" = None
+
+
+class RenderEngine:
+    """Compiled report template, built once per process and reused for every render."""
+
+    def __init__(self, templates_dir: str = TEMPLATES_DIR, bytecode_cache_dir: str | None = None):
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(["html", "xml"]),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+            bytecode_cache=bytecode_cache,
+        )
+        self.template: Template = self.env.get_template("report.html.j2")
+
+    def render_html(self, report: ReportData) -> str:
+        # The stylesheet is applied pre-parsed by the render workers, not inlined
+        return self.template.render(report=report)
+
+
+def get_engine() -> RenderEngine:
+    global _engine
+    if _engine is None:
+        _engine = RenderEngine(bytecode_cache_dir=settings.template_bytecode_cache_dir)
+    return _engine
 
 
 def render_report_html(report: ReportData) -> str:
-    env = _env()
-    template = env.get_template("report.html.j2")
-    with open("app/report/styles/report.css", "r", encoding="utf-8") as f:
-        css_text = f.read()
-    return template.render(report=report, css_inline=css_text)
+    return get_engine().render_html(report)
+
+
+def _init_render_worker(stylesheet_path: str) -> None:
+    # WeasyPrint is imported by the render workers only, never by the web process
+    global _stylesheet, _font_config
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+    _font_config = FontConfiguration()
+    _stylesheet = CSS(filename=stylesheet_path, font_config=_font_config)
+
+
+def _fetch_url(assets: Dict[str, Tuple[str, bytes]], url: str) -> Dict[str, Any]:
+    # Renders never touch the network: remote URLs are served from the prefetched assets
+    from weasyprint import default_url_fetcher
+    asset = assets.get(url)
+    if asset is not None:
+        return {"string": asset[1], "mime_type": asset[0], "redirected_url": url}
+    if url.startswith(("file:", "data:")):
+        return default_url_fetcher(url)
+    raise ValueError(f"Asset was not prefetched: {url}")
+
+
+def _render_pdf(html: str, base_url: str, assets: Dict[str, Tuple[str, bytes]]) -> bytes:
+    # Runs inside a render worker process
+    from weasyprint import HTML
+    document = HTML(string=html, base_url=base_url, url_fetcher=functools.partial(_fetch_url, assets))
+    return document.write_pdf(stylesheets=[_stylesheet], font_config=_font_config)
+
+
+def render_workers() -> int:
+    if settings.render_workers:
+        return settings.render_workers
+    # CPUs this process may run on (container limits included), not host cores
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, _DEFAULT_MAX_WORKERS))
+
+
+def render_stats() -> Dict[str, int]:
+    return {"in_flight": _in_flight, "capacity": render_workers() + settings.render_queue_size}
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=render_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+            initargs=(os.path.abspath(STYLESHEET_PATH),),
+        )
+    return _pool
+
+
+def init_renderer() -> None:
+    get_engine()
+    # Warm one worker so the first report doesn't pay for interpreter start-up;
+    # the pool spawns the rest on demand, keeping startup fast and memory low
+    _render_pool().submit(_warm)
+
+
+def shutdown_renderer() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _release(_future) -> None:
+    # Called from the pool's management thread
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def _warm() -> None:
+    return None
 
 
-async def html_to_pdf(html: str) -> bytes:
-    pdf = HTML(string=html, base_url=os.getcwd()).write_pdf(stylesheets=[CSS(string="")])
-    return pdf
\ No newline at end of file
+async def html_to_pdf(html: str, assets: Optional[Dict[str, "Asset"]] = None) -> bytes:
+    global _in_flight
+    # Renders running plus renders waiting for a worker; beyond that, shed load
+    with _in_flight_lock:
+        if _in_flight >= render_workers() + settings.render_queue_size:
+            raise RenderBusyError("PDF renderer is at capacity")
+        _in_flight += 1
+    try:
+        payload = {url: (a.mime_type, a.data) for url, a in (assets or {}).items()}
+        future = _render_pool().submit(_render_pdf, html, os.getcwd(), payload)
+    except Exception:
+        _release(None)
+        raise
+    # The slot frees when the worker actually finishes, not when the caller gives up
+    future.add_done_callback(_release)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), settings.render_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise RenderTimeoutError(f"PDF render exceeded {settings.render_timeout_seconds:.0f}s")
+    except BrokenProcessPool:
+        shutdown_renderer()
+        raise
\ No newline at end of file
@@ -1,76 +1,124 @@
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+import asyncio
 from ..models import ReportData, ReportSection
 from ..config import settings
-from ..sources.llm import build_report_with_llm
-from ..sources.wikipedia import get_company_overview
+from ..sources.llm import SECTION_SPECS, stream_report_with_llm, stream_sections_with_llm
+from ..sources.wikipedia import Overview, get_company_overview, _slugify
 from ..sources.website import extract_from_urls
-from ..sources.finance import estimate_revenue
+from ..sources.finance import RevenueSeries, describe_revenue, get_revenue_series
 from ..sources.news import summarize_recent_news
 from ..sources.reviews import summarize_public_reviews
+from ..utils.assets import load_assets
+from ..utils.cache import note_degraded
+from ..utils.metrics import span
+
+
+@dataclass
+class PublicResearch:
+    overview: Overview
+    url_insights: Dict[str, str] = field(default_factory=dict)
+    revenue_series: Optional[RevenueSeries] = None
+    outlook: Optional[str] = None
+    reviews: Optional[str] = None
+
+    @property
+    def revenue(self) -> Optional[str]:
+        return describe_revenue(self.revenue_series)
+
+
+async def gather_public_research(company_title: str, reference_urls: Optional[List[str]] = None) -> PublicResearch:
+    # Sources run concurrently; only revenue depends on the overview.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.report_budget_seconds
+
+    async def _bounded(source: str, aw: Awaitable[Any], default: Any = None) -> Any:
+        # A source that fails or misses its deadline just drops its section,
+        # and the report built without it is cached only briefly
+        timeout = min(settings.source_timeout_seconds, max(0.0, deadline - loop.time()))
+        try:
+            with span(f"source.{source}"):
+                return await asyncio.wait_for(aw, timeout)
+        except Exception:
+            note_degraded()
+            return default
+
+    overview_task = asyncio.ensure_future(_bounded("wikipedia", get_company_overview(company_title)))
+
+    async def _revenue() -> Optional[RevenueSeries]:
+        ov = await overview_task
+        if ov is None:
+            return None
+        return await _bounded("finance", get_revenue_series(company_title, ov))
+
+    async def _assets() -> None:
+        # Warms the asset cache so rendering doesn't wait on the logo download
+        ov = await overview_task
+        if ov is not None and ov.logo_url:
+            await _bounded("assets", load_assets([ov.logo_url]))
+
+    overview, url_insights, revenue_series, outlook, reviews, _ = await asyncio.gather(
+        overview_task,
+        # Enrich from provided URLs
+        _bounded("website", extract_from_urls(reference_urls or []), {}),
+        # Finance signals
+        _revenue(),
+        # News and outlook
+        _bounded("news", summarize_recent_news(company_title)),
+        # Reviews
+        _bounded("reviews", summarize_public_reviews(company_title)),
+        # Logo for the cover
+        _assets(),
+    )
 
+    if overview is None:
+        overview = Overview(company_title=company_title, slug=_slugify(company_title))
+    return PublicResearch(overview=overview, url_insights=url_insights, revenue_series=revenue_series,
+                          outlook=outlook, reviews=reviews)
 
-async def assemble_company_report(company_title: str,
-                                 expected_pages: int = 4,
-                                 interests: Optional[str] = None,
-                                 reference_urls: Optional[List[str]] = None) -> ReportData:
-    # Prefer LLM synthesis when available
-    if settings.openai_api_key:
-        llm_report = await build_report_with_llm(company_title, expected_pages, interests, reference_urls)
-        if llm_report:
-            return llm_report
-
-    # Fallback path using public sources without LLM
-    overview = await get_company_overview(company_title)
-
-    # Enrich from provided URLs
-    url_insights = await extract_from_urls(reference_urls or [])
-
-    # Finance signals
-    revenue = await estimate_revenue(company_title, overview)
-
-    # News and outlook
-    outlook = await summarize_recent_news(company_title)
-
-    # Reviews
-    reviews = await summarize_public_reviews(company_title)
 
-    sections: List[ReportSection] = []
+def heuristic_sections(research: PublicResearch) -> Dict[str, ReportSection]:
+    # Keyed like SECTION_SPECS so any of them can stand in for a failed LLM section
+    overview, url_insights, revenue = research.overview, research.url_insights, research.revenue
+    sections: Dict[str, ReportSection] = {}
 
     # Prefer overview summary as intro if present
     if overview.summary:
-        sections.append(ReportSection(title="Executive Summary", content=overview.summary, sources=overview.sources))
+        sections["summary"] = ReportSection(title="Executive Summary", content=overview.summary, sources=overview.sources)
 
     history_text = overview.history or url_insights.get("history", "")
     if history_text:
-        sections.append(ReportSection(title="Brief History", content=history_text, sources=overview.sources))
+        sections["history"] = ReportSection(title="Brief History", content=history_text, sources=overview.sources)
 
     strategy_text = (overview.strategy or "")
-    if outlook:
-        strategy_text = (strategy_text + "\n\n" + outlook).strip()
+    if research.outlook:
+        strategy_text = (strategy_text + "\n\n" + research.outlook).strip()
     if strategy_text:
-        sections.append(ReportSection(title="Strategy and Outlook", content=strategy_text, sources=overview.sources))
+        sections["strategy"] = ReportSection(title="Strategy and Outlook", content=strategy_text, sources=overview.sources)
 
     products_text = "\n".join(f"- {p}" for p in overview.products)
     if products_text or revenue:
         content = (products_text + (f"\n\nEstimated revenue: {revenue}" if revenue else "")).strip()
-        sections.append(ReportSection(title="Key Products and Revenue Streams", content=content, sources=overview.sources))
+        sections["products"] = ReportSection(title="Key Products and Revenue Streams", content=content, sources=overview.sources)
 
     peers_text = "\n".join(f"- {p}" for p in overview.peers)
     if peers_text or overview.differentiation:
         content = (peers_text + (f"\n\nDifferentiation: {overview.differentiation}" if overview.differentiation else "")).strip()
-        sections.append(ReportSection(title="Peers and Competitive Positioning", content=content, sources=overview.sources))
+        sections["peers"] = ReportSection(title="Peers and Competitive Positioning", content=content, sources=overview.sources)
 
     values_text = url_insights.get("values") or overview.values
     if values_text:
-        sections.append(ReportSection(title="Values and Culture", content=values_text, sources=overview.sources))
+        sections["values"] = ReportSection(title="Values and Culture", content=values_text, sources=overview.sources)
+
+    if research.reviews:
+        sections["reviews"] = ReportSection(title="Employee Reviews (Public)", content=research.reviews, sources=overview.sources)
 
-    if reviews:
-        sections.append(ReportSection(title="Employee Reviews (Public)", content=reviews, sources=overview.sources))
+    return sections
 
-    if interests:
-        sections.append(ReportSection(title="Topics of Interest (User)", content=interests.strip(), sources=[]))
 
-    report = ReportData(
+def build_report_data(research: PublicResearch, sections: List[ReportSection], expected_pages: int) -> ReportData:
+    overview = research.overview
+    return ReportData(
         company_title=overview.company_title,
         slug=overview.slug,
         logo_url=overview.logo_url,
@@ -81,7 +129,8 @@ async def assemble_company_report(company_title: str,
         website=overview.website,
         leaders=overview.leaders,
         products=overview.products,
-        revenue=revenue,
+        revenue=research.revenue,
+        revenue_history=research.revenue_series.as_rows() if research.revenue_series else [],
         sections=sections,
         peers=overview.peers,
         differentiation=overview.differentiation,
@@ -89,4 +138,83 @@ async def assemble_company_report(company_title: str,
         meta={"expected_pages": expected_pages}
     )
 
-    return report
\ No newline at end of file
+
+def _interests_section(interests: Optional[str]) -> List[ReportSection]:
+    return [ReportSection(title="Topics of Interest (User)", content=interests.strip(), sources=[])] if interests else []
+
+
+async def stream_company_report(company_title: str,
+                                expected_pages: int = 4,
+                                interests: Optional[str] = None,
+                                reference_urls: Optional[List[str]] = None,
+                                use_llm: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ("section", ReportSection) as sections become ready, then ("report", ReportData).
+
+    A ("fallback", None) item means sections already yielded came from an
+    LLM run that failed; the final report is authoritative.
+    """
+    use_llm = use_llm and bool(settings.openai_api_key)
+
+    if use_llm and settings.llm_mode == "single":
+        sent = False
+        async for kind, value in stream_report_with_llm(company_title, expected_pages, interests, reference_urls):
+            if kind == "report":
+                yield kind, value
+                return
+            sent = True
+            yield kind, value
+        if sent:
+            yield "fallback", None
+
+    if use_llm and settings.llm_mode == "sections":
+        # Map: one completion per section, alongside the public sources that
+        # provide the profile facts and any fallback sections
+        research_task = asyncio.ensure_future(gather_public_research(company_title, reference_urls))
+        try:
+            generated: Dict[str, ReportSection] = {}
+            tokens: Dict[str, Dict[str, Any]] = {}
+            async for key, section, stats in stream_sections_with_llm(company_title, expected_pages,
+                                                                      interests, reference_urls):
+                tokens[key] = stats
+                if section is not None:
+                    generated[key] = section
+                    yield "section", section
+            research = await research_task
+        finally:
+            research_task.cancel()
+
+        # Reduce: LLM sections in guidance order, heuristic ones where a call failed
+        fallback = heuristic_sections(research)
+        sections: List[ReportSection] = []
+        origin: Dict[str, str] = {}
+        for key, _, _ in SECTION_SPECS:
+            if key in generated:
+                sections.append(generated[key])
+                origin[key] = "llm"
+            elif key in fallback:
+                sections.append(fallback[key])
+                origin[key] = "fallback"
+                yield "section", fallback[key]
+        if not generated:
+            sections += _interests_section(interests)
+        report = build_report_data(research, sections, expected_pages)
+        report.meta.update({"llm_mode": "sections", "section_origin": origin, "llm_tokens": tokens})
+        yield "report", report
+        return
+
+    research = await gather_public_research(company_title, reference_urls)
+    sections = list(heuristic_sections(research).values()) + _interests_section(interests)
+    for section in sections:
+        yield "section", section
+    yield "report", build_report_data(research, sections, expected_pages)
+
+
+async def assemble_company_report(company_title: str,
+                                 expected_pages: int = 4,
+                                 interests: Optional[str] = None,
+                                 reference_urls: Optional[List[str]] = None,
+                                 use_llm: bool = True) -> ReportData:
+    async for kind, value in stream_company_report(company_title, expected_pages, interests, reference_urls, use_llm):
+        if kind == "report":
+            return value
+    raise RuntimeError("Report assembly produced no report")
\ No newline at end of file
@@ -0,0 +1,187 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import csv
+import io
+import json
+import time
+import zipfile
+from ..config import settings
+from ..models import BatchItem, BatchRequest
+from ..utils.cache import normalize_key
+from .pipeline import generate_report_pdf
+from .report_cache import CachedReport, report_key
+from .resolve_company import search_companies
+
+BatchResult = Tuple[Dict[str, Any], Optional[CachedReport]]
+
+# Shared by every batch in the process, so concurrent batches cannot multiply the load
+_slots: asyncio.Semaphore | None = None
+
+
+def _batch_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.batch_concurrency)
+    return _slots
+
+
+def parse_csv(text: str) -> BatchRequest:
+    """Companies from CSV: a header with company (or name) and optional expected_pages,
+    interests and "|"-separated reference_urls, or a bare one-name-per-line list."""
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return BatchRequest(companies=[])
+    header = [h.strip().lower() for h in rows[0]]
+    name_col = next((header.index(h) for h in ("company", "name") if h in header), None)
+    if name_col is None:
+        return BatchRequest(companies=[r[0].strip() for r in rows if r and r[0].strip()])
+
+    def _col(row: List[str], name: str) -> str:
+        return row[header.index(name)].strip() if name in header and header.index(name) < len(row) else ""
+
+    items = []
+    for row in rows[1:]:
+        if len(row) <= name_col or not row[name_col].strip():
+            continue
+        pages = _col(row, "expected_pages")
+        items.append(BatchItem(
+            company=row[name_col].strip(),
+            expected_pages=int(pages) if pages.isdigit() else None,
+            interests=_col(row, "interests") or None,
+            reference_urls=[u.strip() for u in _col(row, "reference_urls").split("|") if u.strip()],
+        ))
+    return BatchRequest(companies=items)
+
+
+async def _resolve_all(names: List[str]) -> Dict[str, List[Dict]]:
+    # Each distinct name is resolved once, a bounded number at a time
+    semaphore = asyncio.Semaphore(settings.batch_resolve_concurrency)
+
+    async def _resolve(name: str) -> List[Dict]:
+        async with semaphore:
+            try:
+                return await search_companies(name)
+            except Exception:
+                return []
+
+    unique = {normalize_key(n): n for n in names}
+    found = await asyncio.gather(*(_resolve(n) for n in unique.values()))
+    return dict(zip(unique, found))
+
+
+async def _generate(title: str, expected_pages: int, interests: Optional[str],
+                    reference_urls: List[str], filename: Optional[str]) -> CachedReport:
+    async with _batch_slots():
+        # Batches are throughput-bound: wait for a render slot instead of failing
+        return await generate_report_pdf(title, expected_pages, interests, reference_urls, filename,
+                                         wait_for_renderer=True)
+
+
+async def run_batch(request: BatchRequest) -> AsyncIterator[BatchResult]:
+    """Yield (result, report) per entry in completion order, then ({"summary": ...}, None).
+
+    Entries that resolve to the same report share one pipeline run; source
+    lookups are shared across entries through the research cache and
+    single-flight group.
+    """
+    items = [BatchItem(company=c) if isinstance(c, str) else c for c in request.companies]
+    started = time.monotonic()
+    resolved = await _resolve_all([i.company for i in items])
+
+    runs: Dict[str, asyncio.Future] = {}
+    tasks: List[asyncio.Future] = []
+    done = failed = unresolved = 0
+
+    async def _entry(index: int, item: BatchItem, best: Dict, alternatives: List[str],
+                     run: asyncio.Future) -> BatchResult:
+        result = {"index": index, "company": item.company, "title": best["title"], "score": best["score"],
+                  "alternatives": alternatives}
+        try:
+            report = await asyncio.shield(run)
+        except Exception as exc:
+            result.update(status="failed", error=str(exc) or type(exc).__name__)
+            return result, None
+        result.update(status="done", filename=f"{report.filename}.pdf", pdf_url=f"/reports/{report.key}/pdf",
+                      elapsed_seconds=round(time.monotonic() - started, 2))
+        return result, report
+
+    try:
+        for index, item in enumerate(items):
+            candidates = sorted(resolved.get(normalize_key(item.company)) or [], key=lambda c: c["score"], reverse=True)
+            if not candidates:
+                unresolved += 1
+                yield {"index": index, "company": item.company, "status": "unresolved"}, None
+                continue
+            best = candidates[0]
+            pages = item.expected_pages or request.expected_pages
+            interests = item.interests if item.interests is not None else request.interests
+            key = report_key(best["title"], pages, interests, item.reference_urls)
+            if key not in runs:
+                runs[key] = asyncio.ensure_future(
+                    _generate(best["title"], pages, interests, item.reference_urls, best.get("slug"))
+                )
+            alternatives = [c["title"] for c in candidates[1:4]]
+            tasks.append(asyncio.ensure_future(_entry(index, item, best, alternatives, runs[key])))
+
+        for next_done in asyncio.as_completed(tasks):
+            result, report = await next_done
+            if report is None:
+                failed += 1
+            else:
+                done += 1
+            elapsed = time.monotonic() - started
+            result["reports_per_minute"] = round(done / elapsed * 60, 2) if elapsed else 0.0
+            yield result, report
+    finally:
+        for future in [*tasks, *runs.values()]:
+            future.cancel()
+
+    elapsed = time.monotonic() - started
+    yield {"summary": {
+        "total": len(items),
+        "done": done,
+        "failed": failed,
+        "unresolved": unresolved,
+        "distinct_reports": len(runs),
+        "elapsed_seconds": round(elapsed, 2),
+        "reports_per_minute": round(done / elapsed * 60, 2) if elapsed else 0.0,
+    }}, None
+
+
+async def ndjson_stream(results: AsyncIterator[BatchResult]) -> AsyncIterator[bytes]:
+    async for result, _ in results:
+        yield (json.dumps(result) + "\n").encode("utf-8")
+
+
+class _ZipSink:
+    # Write-only target: zipfile switches to streaming mode (data descriptors)
+    # when tell/seek are unavailable, so each file can be sent as it is added
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def zip_stream(results: AsyncIterator[BatchResult]) -> AsyncIterator[bytes]:
+    sink = _ZipSink()
+    entries = []
+    # PDFs are already compressed
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        async for result, report in results:
+            entries.append(result)
+            if report is not None:
+                name = f"{result['index'] + 1:03d}-{result['filename']}"
+                result["zip_name"] = name
+                archive.writestr(name, report.pdf)
+                yield sink.drain()
+        archive.writestr("results.json", json.dumps(entries, indent=2))
+    yield sink.drain()
\ No newline at end of file
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Tuple
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from ..sources import PLUGINS, plugin_status
+from ..utils.lazy import loaded
+from ..utils.workers import run_blocking
+
+# "import time: self [us] | cumulative | imported package", nested imports indented
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+_lock: asyncio.Lock | None = None
+
+
+class DiagnosticsBusyError(Exception):
+    pass
+
+
+def allowed_modules() -> List[str]:
+    modules = {"app.main", "app.report.pdf", "weasyprint"}
+    for plugin in PLUGINS.values():
+        modules.update((plugin.module, *plugin.requires))
+    return sorted(modules)
+
+
+def _importtime(module: str) -> Tuple[List[Tuple[str, int, int, int]], float]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, timeout=120, cwd=os.getcwd(),
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        found = _IMPORT_LINE.match(line)
+        if found:
+            rows.append((found.group(4), int(found.group(1)), int(found.group(2)), len(found.group(3)) // 2))
+    return rows, wall
+
+
+async def import_report(module: str = "app.main", limit: int = 20) -> Dict[str, Any]:
+    """Import-time breakdown of module in a fresh interpreter, plus what this process has loaded lazily."""
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    # One interpreter at a time, and nobody queues behind it: the report is
+    # for diagnosis, not for load
+    if _lock.locked():
+        raise DiagnosticsBusyError("An import-time report is already running")
+    async with _lock:
+        rows, wall = await run_blocking(_importtime, module)
+
+    # Self time summed per top-level package is where the cost actually lands
+    packages: Dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        top = name.split(".", 1)[0]
+        packages[top] = packages.get(top, 0) + self_us
+    total_us = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), 0)
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "interpreter_ms": round(wall * 1000, 1),
+        "modules_imported": len(rows),
+        "packages": [
+            {"package": name, "self_ms": round(us / 1000, 1)}
+            for name, us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:limit]
+        ],
+        "slowest": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, self_us, cumulative, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:limit]
+        ],
+        "process": {
+            "lazy_imports_ms": {name: round(s * 1000, 1) for name, s in loaded().items()},
+            "sources": plugin_status(),
+        },
+    }
\ No newline at end of file
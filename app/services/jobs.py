@@ -0,0 +1,231 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from ..config import settings
+from ..models import Job, ReportRequest
+from ..utils.workers import run_blocking
+from .pipeline import generate_report_pdf
+from .report_cache import report_key
+
+ACTIVE = ("queued", "running")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobStore(ABC):
+    """Storage backend for job state and finished PDFs."""
+
+    @abstractmethod
+    async def save(self, job: Job) -> None: ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]: ...
+
+    @abstractmethod
+    async def find_active(self, key: str) -> Optional[Job]: ...
+
+    @abstractmethod
+    async def list_active(self) -> List[Job]: ...
+
+    @abstractmethod
+    async def set_result(self, job_id: str, pdf: bytes) -> None: ...
+
+    @abstractmethod
+    async def get_result(self, job_id: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    async def prune(self, older_than: float) -> None: ...
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._results: Dict[str, bytes] = {}
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def find_active(self, key: str) -> Optional[Job]:
+        return next((j for j in self._jobs.values() if j.key == key and j.status in ACTIVE), None)
+
+    async def list_active(self) -> List[Job]:
+        return [j for j in self._jobs.values() if j.status in ACTIVE]
+
+    async def set_result(self, job_id: str, pdf: bytes) -> None:
+        self._results[job_id] = pdf
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        return self._results.get(job_id)
+
+    async def prune(self, older_than: float) -> None:
+        for job_id in [j.id for j in self._jobs.values() if j.status not in ACTIVE and j.updated_at < older_than]:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+
+class SqliteJobStore(JobStore):
+    """Job state in SQLite, so queued jobs and results survive a restart."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL,"
+            " data TEXT NOT NULL, result BLOB, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    async def save(self, job: Job) -> None:
+        await run_blocking(
+            self._execute,
+            "INSERT INTO jobs (id, key, status, data, updated_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data,"
+            " updated_at = excluded.updated_at",
+            (job.id, job.key, job.status, job.model_dump_json(), job.updated_at),
+        )
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        rows = await run_blocking(self._execute, "SELECT data FROM jobs WHERE id = ?", (job_id,))
+        return Job.model_validate_json(rows[0][0]) if rows else None
+
+    async def find_active(self, key: str) -> Optional[Job]:
+        rows = await run_blocking(
+            self._execute, "SELECT data FROM jobs WHERE key = ? AND status IN (?, ?) LIMIT 1", (key, *ACTIVE)
+        )
+        return Job.model_validate_json(rows[0][0]) if rows else None
+
+    async def list_active(self) -> List[Job]:
+        rows = await run_blocking(
+            self._execute, "SELECT data FROM jobs WHERE status IN (?, ?) ORDER BY updated_at", ACTIVE
+        )
+        return [Job.model_validate_json(r[0]) for r in rows]
+
+    async def set_result(self, job_id: str, pdf: bytes) -> None:
+        await run_blocking(self._execute, "UPDATE jobs SET result = ? WHERE id = ?", (pdf, job_id))
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        rows = await run_blocking(self._execute, "SELECT result FROM jobs WHERE id = ?", (job_id,))
+        return rows[0][0] if rows and rows[0][0] is not None else None
+
+    async def prune(self, older_than: float) -> None:
+        await run_blocking(
+            self._execute, "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?", (*ACTIVE, older_than)
+        )
+
+
+def _make_store() -> JobStore:
+    if settings.job_store == "sqlite":
+        return SqliteJobStore(os.path.join(settings.cache_dir, "jobs.sqlite3"))
+    return InMemoryJobStore()
+
+
+class JobManager:
+    """Bounded worker pool that runs report jobs from a queue."""
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self._queue: asyncio.Queue[str] | None = None
+        self._workers: List[asyncio.Task] = []
+        self._requeue: Optional[asyncio.Task] = None
+        self._submit_lock = asyncio.Lock()
+        self.running = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=settings.job_queue_size)
+        # Jobs left queued or running by a previous process start over
+        recovered = await self.store.list_active()
+        for job in recovered:
+            job.status, job.stage, job.progress = "queued", "queued", 0.0
+            await self.store.save(job)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(settings.job_workers)]
+        # More leftovers than the queue holds are fed in as workers free up,
+        # without holding up startup
+        self._requeue = asyncio.create_task(self._enqueue([job.id for job in recovered]))
+
+    async def _enqueue(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            await self._queue.put(job_id)
+
+    async def stop(self) -> None:
+        tasks = [*self._workers, *([self._requeue] if self._requeue else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._requeue = None
+
+    async def submit(self, request: ReportRequest) -> Job:
+        key = report_key(request.company_title, request.expected_pages, request.interests, request.reference_urls)
+        async with self._submit_lock:
+            # Identical in-flight requests share one pipeline run
+            existing = await self.store.find_active(key)
+            if existing:
+                return existing
+            if self._queue.full():
+                raise QueueFullError("Report job queue is full")
+            now = time.time()
+            await self.store.prune(now - settings.job_retention_seconds)
+            job = Job(id=uuid.uuid4().hex, key=key, request=request, created_at=now, updated_at=now)
+            await self.store.save(job)
+            self._queue.put_nowait(job.id)
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize() if self._queue else 0, "running": self.running}
+
+    async def _update(self, job: Job, **changes) -> None:
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        await self.store.save(job)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.store.get(job_id)
+                if job is not None and job.status == "queued":
+                    self.running += 1
+                    try:
+                        await self._run(job)
+                    finally:
+                        self.running -= 1
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        await self._update(job, status="running", stage="starting", progress=0.0)
+
+        async def on_stage(stage: str, progress: float) -> None:
+            await self._update(job, stage=stage, progress=progress)
+
+        req = job.request
+        try:
+            # Jobs are not latency-bound: wait for a render slot instead of failing
+            report = await generate_report_pdf(req.company_title, req.expected_pages, req.interests,
+                                               req.reference_urls, on_stage=on_stage, wait_for_renderer=True)
+        except Exception as exc:
+            await self._update(job, status="failed", stage="failed", error=str(exc) or type(exc).__name__)
+            return
+        await self.store.set_result(job.id, report.pdf)
+        await self._update(job, status="done", stage="done", progress=1.0, filename=report.filename)
+
+
+job_manager = JobManager(_make_store())
\ No newline at end of file
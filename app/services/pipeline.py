@@ -0,0 +1,127 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+from .assemble_report import assemble_company_report, stream_company_report
+from .report_cache import CachedReport, get_cached_report, report_key, store_report
+from ..config import settings
+from ..models import ReportData
+from ..report.pdf import RenderBusyError, html_to_pdf, render_report_html
+from ..utils.assets import Asset, load_assets, remote_assets
+from ..utils.cache import track_source_expiry
+from ..utils.metrics import REPORT_CACHE, span, track_timings
+
+StageCallback = Callable[[str, float], Awaitable[None]]
+
+
+async def _noop_stage(stage: str, progress: float) -> None:
+    return None
+
+
+async def _cached_report(key: str) -> Optional[CachedReport]:
+    cached = await get_cached_report(key)
+    REPORT_CACHE.labels("hit" if cached else "miss").inc()
+    return cached
+
+
+async def generate_report_pdf(company_title: str,
+                              expected_pages: int = 4,
+                              interests: Optional[str] = None,
+                              reference_urls: Optional[List[str]] = None,
+                              filename: Optional[str] = None,
+                              on_stage: StageCallback = _noop_stage,
+                              wait_for_renderer: bool = False) -> CachedReport:
+    """wait_for_renderer: retry a busy renderer (up to render_wait_max_seconds)
+    instead of raising RenderBusyError, for callers that are not latency-bound."""
+    reference_urls = reference_urls or []
+    key = report_key(company_title, expected_pages, interests, reference_urls)
+    cached = await _cached_report(key)
+    if cached:
+        return cached
+
+    await on_stage("researching", 0.1)
+    with track_timings() as timings, span("report"):
+        with track_source_expiry() as source_expiries, span("research"):
+            report_data = await assemble_company_report(
+                company_title=company_title,
+                expected_pages=expected_pages,
+                interests=interests,
+                reference_urls=reference_urls,
+            )
+        report_data.meta["timings"] = timings
+        return await _render(key, report_data, company_title, filename, source_expiries, on_stage,
+                             wait_for_renderer)
+
+
+async def _html_to_pdf(html: str, assets: Dict[str, Asset], on_stage: StageCallback, wait: bool) -> bytes:
+    # Only the render step is retried: research and LLM output are kept
+    deadline = time.monotonic() + settings.render_wait_max_seconds
+    while True:
+        try:
+            with span("render.pdf"):
+                return await html_to_pdf(html, assets)
+        except RenderBusyError:
+            if not wait:
+                raise
+            if time.monotonic() + settings.render_retry_after_seconds > deadline:
+                raise RenderBusyError(f"No render slot within {settings.render_wait_max_seconds:g}s")
+            await on_stage("waiting_for_renderer", 0.8)
+            await asyncio.sleep(settings.render_retry_after_seconds)
+
+
+async def _render(key: str,
+                  report_data: ReportData,
+                  company_title: str,
+                  filename: Optional[str],
+                  source_expiries: List[float],
+                  on_stage: StageCallback,
+                  wait_for_renderer: bool = False) -> CachedReport:
+    await on_stage("rendering_html", 0.7)
+    with span("render.html"):
+        html = render_report_html(report_data)
+    with span("render.assets"):
+        # Normally prefetched during research, so these are cache hits
+        assets = await load_assets(remote_assets(html))
+    await on_stage("rendering_pdf", 0.8)
+    pdf_bytes = await _html_to_pdf(html, assets, on_stage, wait_for_renderer)
+    filename = filename or report_data.slug or company_title.lower().replace(" ", "-")
+    return await store_report(key, pdf_bytes, filename, source_expiries)
+
+
+async def stream_report(company_title: str,
+                        expected_pages: int = 4,
+                        interests: Optional[str] = None,
+                        reference_urls: Optional[List[str]] = None,
+                        filename: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Report generation as (event, data) pairs for Server-Sent Events.
+
+    Sections are sent as soon as each one is ready, in completion order; if
+    a single-call LLM run fails part way, a "fallback" stage precedes the
+    public-source sections. The final "report" event is authoritative.
+    """
+    reference_urls = reference_urls or []
+    key = report_key(company_title, expected_pages, interests, reference_urls)
+    cached = await _cached_report(key)
+    if cached:
+        yield "done", {"key": key, "pdf_url": f"/reports/{key}/pdf", "cached": True}
+        return
+
+    yield "stage", {"stage": "researching"}
+    report_data = None
+    with track_timings() as timings, span("report"):
+        with track_source_expiry() as source_expiries, span("research"):
+            index = 0
+            async for kind, value in stream_company_report(company_title, expected_pages, interests, reference_urls):
+                if kind == "section":
+                    yield "section", {"index": index, **value.model_dump()}
+                    index += 1
+                elif kind == "fallback":
+                    yield "stage", {"stage": "fallback"}
+                else:
+                    report_data = value
+        report_data.meta["timings"] = timings
+        yield "report", report_data.model_dump()
+
+        yield "stage", {"stage": "rendering"}
+        report = await _render(key, report_data, company_title, filename, source_expiries, _noop_stage)
+    yield "done", {"key": report.key, "pdf_url": f"/reports/{report.key}/pdf", "cached": False,
+                   "timings": timings}
\ No newline at end of file
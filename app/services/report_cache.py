@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import hashlib
+import json
+import os
+import tempfile
+import time
+from ..config import settings
+from ..utils.cache import SOURCE_DATA_VERSION, normalize_key
+from ..utils.workers import run_blocking
+
+
+@dataclass
+class CachedReport:
+    key: str
+    etag: str
+    filename: str
+    expires_at: float
+    pdf: bytes
+
+
+def report_key(company_title: str,
+               expected_pages: int,
+               interests: Optional[str],
+               reference_urls: Optional[List[str]]) -> str:
+    normalized = {
+        "company": normalize_key(company_title),
+        "expected_pages": expected_pages,
+        "interests": normalize_key(interests or ""),
+        "reference_urls": sorted({u.strip() for u in reference_urls or [] if u.strip()}),
+        "llm": bool(settings.openai_api_key),
+        "version": SOURCE_DATA_VERSION,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _dir() -> str:
+    return os.path.join(settings.cache_dir, "reports")
+
+
+def _read(key: str) -> Optional[CachedReport]:
+    meta_path = os.path.join(_dir(), f"{key}.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["expires_at"] <= time.time():
+            _remove(key)
+            return None
+        with open(os.path.join(_dir(), f"{key}.pdf"), "rb") as f:
+            pdf = f.read()
+    except (OSError, ValueError, KeyError):
+        return None
+    return CachedReport(key=key, etag=meta["etag"], filename=meta["filename"],
+                        expires_at=meta["expires_at"], pdf=pdf)
+
+
+def _replace(path: str, data: bytes) -> None:
+    # A temp file per writer, so concurrent writers of one key never share it
+    fd, tmp = tempfile.mkstemp(dir=_dir(), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _write(report: CachedReport) -> None:
+    os.makedirs(_dir(), exist_ok=True)
+    # PDF first, metadata last: a reader never sees metadata without its file
+    _replace(os.path.join(_dir(), f"{report.key}.pdf"), report.pdf)
+    meta = {"etag": report.etag, "filename": report.filename, "expires_at": report.expires_at}
+    _replace(os.path.join(_dir(), f"{report.key}.json"), json.dumps(meta).encode("utf-8"))
+    _prune()
+
+
+def _remove(key: str) -> None:
+    for ext in ("json", "pdf"):
+        try:
+            os.remove(os.path.join(_dir(), f"{key}.{ext}"))
+        except OSError:
+            pass
+
+
+def _prune() -> None:
+    # Drop expired reports, then the oldest ones until under the size budget
+    entries = []
+    now = time.time()
+    for name in os.listdir(_dir()):
+        if not name.endswith(".json"):
+            continue
+        key = name[:-5]
+        try:
+            with open(os.path.join(_dir(), name), "r", encoding="utf-8") as f:
+                expires_at = json.load(f)["expires_at"]
+            stat = os.stat(os.path.join(_dir(), f"{key}.pdf"))
+        except (OSError, ValueError, KeyError):
+            _remove(key)
+            continue
+        if expires_at <= now:
+            _remove(key)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, key))
+    total = sum(size for _, size, _ in entries)
+    budget = settings.report_cache_max_mb * 1024 * 1024
+    for _, size, key in sorted(entries):
+        if total <= budget:
+            break
+        _remove(key)
+        total -= size
+
+
+async def get_cached_report(key: str) -> Optional[CachedReport]:
+    if not settings.cache_enabled:
+        return None
+    return await run_blocking(_read, key)
+
+
+async def store_report(key: str, pdf: bytes, filename: str, source_expiries: List[float]) -> CachedReport:
+    # A report lives only as long as the shortest-lived source entry behind it
+    expires_at = min(source_expiries + [time.time() + settings.cache_ttl_report])
+    report = CachedReport(key=key, etag=hashlib.sha256(pdf).hexdigest()[:32],
+                          filename=filename, expires_at=expires_at, pdf=pdf)
+    if settings.cache_enabled:
+        await run_blocking(_write, report)
+    return report
\ No newline at end of file
@@ -1,37 +1,116 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import html
+import os
 import re
-import wikipedia
+from ..config import settings
+from ..utils.cache import cached, note_degraded
+from ..utils.http import fetch_json
+from ..sources.wikipedia import get_company_overview
+from ..utils.workers import run_blocking
+from .title_index import TitleEntry, TitleIndex, company_signal, title_index
+
+# Typed queries kept as aliases per title
+_MAX_ALIASES = 8
 
 
 def _slugify(title: str) -> str:
     return re.sub(r"[^a-z0-9-]", "", title.lower().replace(" ", "-"))
 
 
-async def search_companies(query: str) -> List[Dict]:
+def _history_path() -> str:
+    return os.path.join(settings.cache_dir, "resolutions.jsonl")
+
+
+def load_title_index() -> int:
+    loaded = title_index.load(settings.title_index_seed_path) if settings.title_index_seed_path else 0
+    TitleIndex.compact(_history_path(), settings.resolve_history_max_entries)
+    return loaded + title_index.load(_history_path())
+
+
+async def record_resolution(title: str, query: Optional[str] = None) -> None:
+    # A confirmed choice seeds the index, but only once it is known to be a real
+    # article (the overview is cached for the report anyway); the typed query
+    # becomes an alias
+    try:
+        overview = await get_company_overview(title)
+    except Exception:
+        return
+    if overview is None or not overview.summary:
+        # Missing or disambiguation page
+        return
+    title = overview.company_title
+    known = title_index.entries.get(title.lower())
+    before = (len(known.aliases), known.company) if known else None
+    aliases = [query] if query and (known is None or len(known.aliases) < _MAX_ALIASES) else []
+    entry = title_index.add(title, aliases=aliases, company=1.0)
+    if before != (len(entry.aliases), entry.company):
+        await run_blocking(TitleIndex.append, _history_path(), entry)
+
+
+@cached("resolve")
+async def _remote_search(query: str) -> List[Dict[str, str]]:
+    params = {
+        "action": "query",
+        "list": "search",
+        "srsearch": query,
+        "srlimit": 8,
+        "srprop": "snippet",
+        "format": "json",
+        "formatversion": 2,
+    }
     try:
-        results = wikipedia.search(query, results=8, suggestion=False)
+        data = await fetch_json(settings.wikipedia_api_url, params=params)
     except Exception:
-        results = []
-
-    candidates: List[Dict] = []
-    for title in results:
-        score = 1.0 if title.lower() == query.lower() else (0.9 if query.lower() in title.lower() else 0.6)
-        url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-        candidates.append({
-            "title": title,
-            "description": "Wikipedia",
-            "url": url,
-            "score": score,
-            "slug": _slugify(title),
-        })
-
-    # Deduplicate by title
-    seen = set()
-    uniq = []
-    for c in candidates:
-        if c["title"].lower() in seen:
-            continue
-        seen.add(c["title"].lower())
-        uniq.append(c)
-
-    return uniq
\ No newline at end of file
+        note_degraded()
+        return []
+    results = []
+    for item in data.get("query", {}).get("search", []):
+        snippet = html.unescape(re.sub(r"<[^>]+>", "", item.get("snippet", "")))
+        results.append({"title": item["title"], "snippet": snippet})
+    return results
+
+
+def _candidate(entry: TitleEntry, score: float) -> Dict:
+    return {
+        "title": entry.title,
+        "description": entry.description or "Wikipedia",
+        "url": f"https://en.wikipedia.org/wiki/{entry.title.replace(' ', '_')}",
+        "score": score,
+        "slug": _slugify(entry.title),
+    }
+
+
+def _confident(ranked: List[tuple]) -> bool:
+    if not ranked or ranked[0][1] < 0.9:
+        return False
+    return len(ranked) == 1 or ranked[0][1] - ranked[1][1] >= settings.resolve_margin
+
+
+async def search_companies(query: str) -> List[Dict]:
+    # Local index first; the remote search only runs when it has no clear winner
+    ranked = title_index.search(query)
+    if not _confident(ranked):
+        # Remote hits are ranked alongside the local ones for this query only
+        merged = {entry.title.lower(): (entry, score) for entry, score in ranked}
+        for result in await _remote_search(query):
+            key = result["title"].lower()
+            if key in merged:
+                continue
+            entry = title_index.entries.get(key) or TitleEntry(
+                title=result["title"], description=result["snippet"] or None,
+                company=company_signal(result["title"], result["snippet"]),
+            )
+            merged[key] = (entry, title_index.score(query, entry))
+        ranked = sorted(merged.values(), key=lambda pair: pair[1], reverse=True)[:8]
+
+    if _confident(ranked):
+        # A clear winner skips the disambiguation step entirely
+        return [_candidate(*ranked[0])]
+    return [_candidate(entry, score) for entry, score in ranked if score >= settings.resolve_min_score]
+
+
+def autocomplete(query: str, limit: int = 8) -> List[Dict]:
+    entries = title_index.prefix(query, limit)
+    seen = {e.title for e in entries}
+    entries += [e for e, _ in title_index.search(query, limit) if e.title not in seen]
+    return [{"title": e.title, "description": e.description} for e in entries[:limit]]
\ No newline at end of file
@@ -0,0 +1,164 @@
+from dataclasses import asdict, dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+import json
+import os
+import re
+from ..utils.text import core_name
+
+_COMPANY_WORDS = re.compile(
+    r"\b(company|corporation|conglomerate|multinational|manufacturer|retailer|bank|brand|firm|"
+    r"inc|corp|ltd|plc|llc|startup|subsidiary|enterprise|holding|airline|automaker|publisher|"
+    r"label|studio|developer|operator|provider|maker|chain)\b",
+    re.IGNORECASE,
+)
+
+
+def company_signal(title: str, description: Optional[str]) -> float:
+    if re.search(r"\((company|corporation|business)\)", title, re.IGNORECASE):
+        return 1.0
+    if re.search(r"\b(inc|corp|corporation|ltd|plc|llc|ag|gmbh|s\.a)\.?$", title, re.IGNORECASE):
+        return 1.0
+    return 1.0 if description and _COMPANY_WORDS.search(description) else 0.0
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class TitleEntry:
+    title: str
+    description: Optional[str] = None
+    aliases: List[str] = field(default_factory=list)
+    company: float = 0.0
+
+
+class TitleIndex:
+    """In-memory prefix + trigram index over known company titles and aliases."""
+
+    def __init__(self):
+        self.entries: Dict[str, TitleEntry] = {}
+        self._sorted: List[Tuple[str, str]] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, title: str, description: Optional[str] = None, aliases: Iterable[str] = (),
+            company: Optional[float] = None) -> TitleEntry:
+        key = title.lower()
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = TitleEntry(title=title)
+            self._index_name(title, key)
+        if description and not entry.description:
+            entry.description = description
+        for alias in aliases:
+            if alias and alias.lower() != key and alias not in entry.aliases:
+                entry.aliases.append(alias)
+                self._index_name(alias, key)
+        signal = company_signal(title, entry.description) if company is None else company
+        entry.company = max(entry.company, signal)
+        return entry
+
+    def _index_name(self, name: str, key: str) -> None:
+        core = core_name(name) or name.lower()
+        bisect.insort(self._sorted, (core, key))
+        for gram in _trigrams(core):
+            self._trigrams.setdefault(gram, set()).add(key)
+
+    def prefix(self, query: str, limit: int = 8) -> List[TitleEntry]:
+        core = core_name(query) or query.lower().strip()
+        if not core:
+            return []
+        found: Dict[str, TitleEntry] = {}
+        i = bisect.bisect_left(self._sorted, (core, ""))
+        while i < len(self._sorted) and self._sorted[i][0].startswith(core) and len(found) < limit:
+            key = self._sorted[i][1]
+            found.setdefault(key, self.entries[key])
+            i += 1
+        return list(found.values())
+
+    def similarity(self, query: str, entry: TitleEntry) -> float:
+        q = core_name(query) or query.lower().strip()
+        best = 0.0
+        for name in [entry.title, *entry.aliases]:
+            n = core_name(name) or name.lower()
+            if n == q:
+                return 1.0
+            ratio = SequenceMatcher(None, q, n).ratio()
+            if n.startswith(q):
+                ratio = max(ratio, 0.75 + 0.2 * len(q) / max(len(n), 1))
+            best = max(best, ratio)
+        return best
+
+    def score(self, query: str, entry: TitleEntry) -> float:
+        return round(0.75 * self.similarity(query, entry) + 0.25 * entry.company, 3)
+
+    def search(self, query: str, limit: int = 8) -> List[Tuple[TitleEntry, float]]:
+        core = core_name(query) or query.lower().strip()
+        if not core:
+            return []
+        counts: Dict[str, int] = {}
+        for gram in _trigrams(core):
+            for key in self._trigrams.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        for entry in self.prefix(query, limit):
+            counts.setdefault(entry.title.lower(), 0)
+        shortlist = sorted(counts, key=counts.get, reverse=True)[:50]
+        scored = [(self.entries[k], self.score(query, self.entries[k])) for k in shortlist]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:limit]
+
+    def load(self, path: str) -> int:
+        # JSON lines of {"title", "description"?, "aliases"?, "company"?}
+        if not path or not os.path.exists(path):
+            return 0
+        loaded = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    self.add(row["title"], row.get("description"), row.get("aliases") or (), row.get("company"))
+                    loaded += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return loaded
+
+    @staticmethod
+    def compact(path: str, max_entries: int) -> None:
+        # Keep one line per title (the last one written is the most complete),
+        # and only the max_entries most recently written titles
+        if not path or not os.path.exists(path):
+            return
+        rows: Dict[str, dict] = {}
+        lines = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    row = json.loads(line)
+                    key = row["title"].lower()
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+                rows.pop(key, None)
+                rows[key] = row
+        if lines <= min(len(rows), max_entries):
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in list(rows.values())[-max_entries:]:
+                f.write(json.dumps(row) + "\n")
+        os.replace(tmp, path)
+
+    @staticmethod
+    def append(path: str, entry: TitleEntry) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+
+
+title_index = TitleIndex()
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Research sources and the heavy libraries each one loads on first use.
+
+Source modules only reference their third-party clients through
+utils.lazy, so importing the app stays cheap. The registry records what
+every source needs, for the optional warm-up and import diagnostics.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+import sys
+from ..config import settings
+from ..utils.lazy import import_module, loaded
+
+
+@dataclass(frozen=True)
+class SourcePlugin:
+    name: str
+    requires: Tuple[str, ...] = ()
+    enabled: Callable[[], bool] = lambda: True
+
+    @property
+    def module(self) -> str:
+        return f"{__name__}.{self.name}"
+
+    def is_loaded(self) -> bool:
+        return all(m in sys.modules for m in (self.module, *self.requires))
+
+
+PLUGINS: Dict[str, SourcePlugin] = {p.name: p for p in [
+    SourcePlugin("wikipedia", ("lxml.html",)),
+    SourcePlugin("wikidata"),
+    SourcePlugin("finance", ("yfinance",)),
+    SourcePlugin("news", enabled=lambda: bool(settings.newsapi_key)),
+    SourcePlugin("reviews", ("duckduckgo_search", "trafilatura")),
+    SourcePlugin("website", ("trafilatura",)),
+    SourcePlugin("llm", ("openai", "duckduckgo_search", "trafilatura", "tiktoken"),
+                 enabled=lambda: bool(settings.openai_api_key)),
+]}
+
+
+def enabled_plugins() -> List[SourcePlugin]:
+    return [p for p in PLUGINS.values() if p.enabled()]
+
+
+def warm_up() -> Dict[str, float]:
+    """Import the enabled sources and the libraries they need; returns first-import seconds per module."""
+    for plugin in enabled_plugins():
+        for name in (plugin.module, *plugin.requires):
+            import_module(name)
+    return loaded()
+
+
+def plugin_status() -> Dict[str, Dict[str, object]]:
+    return {
+        p.name: {"enabled": p.enabled(), "requires": list(p.requires), "loaded": p.is_loaded()}
+        for p in PLUGINS.values()
+    }
\ No newline at end of file
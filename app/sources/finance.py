@@ -1,41 +1,133 @@
-from typing import Optional
-import re
-import yfinance as yf
-
-
-async def estimate_revenue(company_title: str, overview) -> Optional[str]:
-    # Try naive ticker inference: handle well-known suffixes like (company) or plain title symbol
-    # This is intentionally conservative to avoid wrong matches
-    possible = []
-    cleaned = re.sub(r"[^A-Za-z0-9 ]", "", company_title)
-    tokens = cleaned.split()
-    if tokens and len(tokens) <= 3:
-        sym = "".join(t[0] for t in tokens).upper()
-        if 1 <= len(sym) <= 5:
-            possible.append(sym)
-    # Also try exact uppercase token
-    if len(tokens) == 1 and 1 <= len(tokens[0]) <= 5:
-        possible.append(tokens[0].upper())
-
-    for ticker in possible:
-        try:
-            t = yf.Ticker(ticker)
-            fin = t.financials
-            if fin is not None and not fin.empty:
-                if "Total Revenue" in fin.index:
-                    revenue_series = fin.loc["Total Revenue"].dropna()
-                else:
-                    revenue_series = fin.iloc[0].dropna()
-                if not revenue_series.empty:
-                    latest = float(revenue_series.iloc[0])
-                    if latest >= 1e9:
-                        return f"~${latest/1e9:.1f}B (est.)"
-                    elif latest >= 1e6:
-                        return f"~${latest/1e6:.0f}M (est.)"
-                    else:
-                        return f"~${latest:,.0f} (est.)"
-        except Exception:
-            continue
-
-    # fallback: unknown
-    return None
\ No newline at end of file
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import csv
+import numpy as np
+from ..config import settings
+from ..utils.cache import cached, note_degraded
+from ..utils.lazy import LazyModule
+from ..utils.text import core_name
+from ..utils.workers import run_blocking
+
+# yfinance pulls in pandas: both load with the first revenue lookup
+yf = LazyModule("yfinance")
+
+
+@dataclass
+class RevenueSeries:
+    symbol: str
+    years: np.ndarray  # int16 fiscal years, newest first
+    values: np.ndarray  # float64 total revenue, aligned with years
+
+    @property
+    def latest(self) -> float:
+        return float(self.values[0])
+
+    def growth(self) -> np.ndarray:
+        # Year-over-year growth aligned with years; the oldest year has none
+        if len(self.values) < 2:
+            return np.array([], dtype=np.float64)
+        return self.values[:-1] / self.values[1:] - 1.0
+
+    def cagr(self) -> Optional[float]:
+        span = int(self.years[0]) - int(self.years[-1])
+        if span <= 0 or self.values[-1] <= 0:
+            return None
+        return float((self.values[0] / self.values[-1]) ** (1.0 / span) - 1.0)
+
+    def as_rows(self) -> List[Dict[str, Any]]:
+        growth = self.growth()
+        return [
+            {
+                "year": int(year),
+                "revenue": float(value),
+                "display": format_amount(float(value), self.symbol),
+                "growth": float(growth[i]) if i < len(growth) else None,
+            }
+            for i, (year, value) in enumerate(zip(self.years, self.values))
+        ]
+
+
+class SymbolTable:
+    """Company names and aliases to ticker symbols, loaded from the bundled CSV."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._by_name: Dict[str, str] | None = None
+
+    def _load(self) -> Dict[str, str]:
+        by_name: Dict[str, str] = {}
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                names = [row["name"], *(row.get("aliases") or "").split("|")]
+                for name in names:
+                    key = core_name(name)
+                    if key:
+                        by_name.setdefault(key, row["symbol"].strip())
+        return by_name
+
+    def lookup(self, *names: str) -> Optional[str]:
+        if self._by_name is None:
+            self._by_name = self._load()
+        for name in names:
+            symbol = self._by_name.get(core_name(name or ""))
+            if symbol:
+                return symbol
+        return None
+
+
+symbol_table = SymbolTable(settings.symbol_table_path)
+
+
+def format_amount(value: float, symbol: str = "") -> str:
+    # Non-US listings report in local currency, so only bare US symbols get "$"
+    unit = "$" if "." not in symbol else ""
+    if value >= 1e9:
+        return f"~{unit}{value/1e9:.1f}B"
+    elif value >= 1e6:
+        return f"~{unit}{value/1e6:.0f}M"
+    return f"~{unit}{value:,.0f}"
+
+
+def resolve_symbol(company_title: str, overview) -> Optional[str]:
+    # Wikidata listings first, then the bundled table; never guess from initials
+    for ticker in getattr(overview, "tickers", None) or []:
+        if ticker.get("yahoo"):
+            return ticker["yahoo"]
+    return symbol_table.lookup(company_title, getattr(overview, "company_title", "") or "")
+
+
+def _load_revenue(symbol: str) -> Optional[RevenueSeries]:
+    # One income statement request per report
+    stmt = yf.Ticker(symbol).income_stmt
+    if stmt is None or stmt.empty:
+        return None
+    row = stmt.loc["Total Revenue"] if "Total Revenue" in stmt.index else stmt.iloc[0]
+    row = row.dropna()
+    if row.empty:
+        return None
+    row = row.sort_index(ascending=False)
+    years = np.fromiter((ts.year for ts in row.index), dtype=np.int16, count=len(row))
+    values = row.to_numpy(dtype=np.float64)
+    return RevenueSeries(symbol=symbol, years=years, values=values)
+
+
+@cached("finance")
+async def get_revenue_series(company_title: str, overview) -> Optional[RevenueSeries]:
+    symbol = resolve_symbol(company_title, overview)
+    if not symbol:
+        return None
+    try:
+        return await run_blocking(_load_revenue, symbol)
+    except Exception:
+        note_degraded()
+        return None
+
+
+def describe_revenue(series: Optional[RevenueSeries]) -> Optional[str]:
+    if series is None:
+        return None
+    text = f"{format_amount(series.latest, series.symbol)} (FY{int(series.years[0])}, {series.symbol})"
+    growth = series.growth()
+    if len(growth):
+        text += f", {growth[0]:+.1%} YoY"
+    return text
\ No newline at end of file
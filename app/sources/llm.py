@@ -1,13 +1,45 @@
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
 import json
-from duckduckgo_search import DDGS
-import trafilatura
-from openai import OpenAI
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 from ..config import settings
 from ..models import ReportData, ReportSection
+from ..utils.cache import cached, normalize_key, note_degraded, research_cache
+from ..utils.lazy import LazyModule
+from ..utils.metrics import record_upstream, span, status_outcome
+from ..utils.packing import ChunkIndex, count_tokens, pack_documents, token_budget
+from ..utils.pages import fetch_page_text
+from ..utils.search import search_links
+from ..utils.workers import run_cpu
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-def _search_urls(company_title: str) -> List[str]:
+openai = LazyModule("openai")
+
+# Extracted pages are capped before chunking; packing picks what reaches the prompt
+_MAX_DOC_CHARS = 50000
+
+# (key, guidance, title) per report section; the key pairs an LLM section
+# with its heuristic fallback in the public-source path
+SECTION_SPECS = [
+    ("summary", "Executive summary", "Executive Summary"),
+    ("history", "Brief history", "Brief History"),
+    ("strategy", "Strategy and future outlook (growth areas)", "Strategy and Outlook"),
+    ("products", "Key products and revenue streams", "Key Products and Revenue Streams"),
+    ("peers", "Peers and competitive differentiation", "Peers and Competitive Positioning"),
+    ("values", "Values and culture", "Values and Culture"),
+    ("reviews", "Public reviews summary (e.g., Glassdoor)", "Employee Reviews (Public)"),
+]
+_SECTION_GUIDANCE = [guidance for _, guidance, _ in SECTION_SPECS]
+
+# (messages, packing stats) for one section completion
+SectionPrompt = Tuple[List[Dict[str, str]], Dict[str, Any]]
+
+
+@cached("search")
+async def _search_urls(company_title: str) -> List[str]:
     queries = [
         company_title,
         f"{company_title} about",
@@ -18,16 +50,14 @@ def _search_urls(company_title: str) -> List[str]:
         f"{company_title} values",
         f"{company_title} Glassdoor",
     ]
-    urls: List[str] = []
-    try:
-        with DDGS() as ddgs:
-            for q in queries:
-                for r in ddgs.text(q, max_results=3):
-                    link = r.get("link")
-                    if link and link.startswith("http"):
-                        urls.append(link)
-    except Exception:
-        pass
+    semaphore = asyncio.Semaphore(settings.llm_search_concurrency)
+
+    async def _search(q: str) -> List[str]:
+        async with semaphore:
+            return await search_links(q, max_results=3)
+
+    # results stay in query order so the most general hits come first
+    urls: List[str] = [u for links in await asyncio.gather(*(_search(q) for q in queries)) for u in links]
     # de-duplicate while preserving order
     seen = set()
     deduped = []
@@ -39,32 +69,152 @@ def _search_urls(company_title: str) -> List[str]:
     return deduped[:12]
 
 
-def _load_pages(urls: List[str]) -> List[Dict[str, str]]:
-    docs = []
-    for u in urls:
-        try:
-            downloaded = trafilatura.fetch_url(u)
-            if not downloaded:
-                continue
-            text = trafilatura.extract(downloaded, include_comments=False, include_formatting=False)
-            if not text:
-                continue
-            docs.append({"url": u, "content": text[:6000]})
-        except Exception:
-            continue
-    return docs
+async def _load_pages(urls: List[str]) -> List[Dict[str, str]]:
+    # The given URL order (reference pages, then search hits in query order)
+    # decides the selection, not load order, so the same pages give the same
+    # documents (and the same completion cache keys) on every run
+    semaphore = asyncio.Semaphore(settings.llm_fetch_concurrency)
+
+    async def _load(u: str) -> Tuple[str, Optional[str]]:
+        async with semaphore:
+            try:
+                text = await asyncio.wait_for(fetch_page_text(u), settings.llm_page_timeout_seconds)
+            except Exception:
+                note_degraded()
+                text = None
+        return u, text
+
+    def _selected() -> Optional[List[str]]:
+        # The first URLs holding llm_target_docs substantial documents, once all of them have finished
+        chosen, good = [], 0
+        for u in urls:
+            if u not in finished:
+                return None
+            if u in texts:
+                chosen.append(u)
+                good += len(texts[u]) >= settings.llm_min_doc_chars
+                if good >= settings.llm_target_docs:
+                    return chosen
+        return chosen
+
+    tasks = [asyncio.ensure_future(_load(u)) for u in urls]
+    texts: Dict[str, str] = {}
+    finished = set()
+    chosen: Optional[List[str]] = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            u, text = await next_done
+            finished.add(u)
+            if text:
+                texts[u] = text
+            # Stop waiting on slow URLs once the leading ones are enough to write from
+            chosen = _selected()
+            if chosen is not None:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return [{"url": u, "content": texts[u][:_MAX_DOC_CHARS]} for u in chosen or []]
+
+
+_TEMPERATURE = 0.2
+
+_client: "AsyncOpenAI | None" = None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    # One client per process so completions reuse pooled connections
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url,
+                                     timeout=settings.llm_timeout_seconds)
+    return _client
+
+
+def _record_openai(exc: Optional[BaseException] = None) -> None:
+    if exc is None:
+        outcome = "ok"
+    elif isinstance(exc, asyncio.TimeoutError):
+        outcome = "timeout"
+    elif getattr(exc, "status_code", None):
+        outcome = status_outcome(exc.status_code)
+    else:
+        outcome = "error"
+    record_upstream("openai", outcome)
+
+
+async def close_openai_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+class SectionStream:
+    """Pulls finished objects out of the "sections" array of a JSON payload as it streams in."""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._in_sections = False
+        self._section_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        buf = self.buffer
+        found: List[Dict[str, Any]] = []
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buf[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_string == "sections":
+                    self._in_sections = True
+                elif c == "{" and self._in_sections and self._depth == 3:
+                    self._section_start = i
+            elif c in "}]":
+                if c == "}" and self._section_start is not None and self._depth == 3:
+                    try:
+                        found.append(json.loads(buf[self._section_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._section_start = None
+                elif c == "]" and self._in_sections and self._depth == 2:
+                    self._in_sections = False
+                self._depth -= 1
+        self._pos = len(buf)
+        return found
+
+
+_SYSTEM_PROMPT = (
+    "You are a senior consulting analyst. Synthesize concise, accurate company research in a clear, executive style. "
+    "Be factual and cite which sources informed which sections by including a sources list."
+)
 
 
 def _build_prompt(company_title: str, interests: Optional[str], expected_pages: int, docs: List[Dict[str, str]]) -> List[Dict[str, str]]:
-    system = (
-        "You are a senior consulting analyst. Synthesize concise, accurate company research in a clear, executive style. "
-        "Be factual and cite which sources informed which sections by including a sources list."
-    )
     user = {
         "company": company_title,
         "expected_pages": expected_pages,
         "interests": interests or "",
-        "documents": docs[:10],
+        "documents": docs,
         "output_format": {
             "company_title": "string",
             "location": "string?",
@@ -86,28 +236,149 @@ def _build_prompt(company_title: str, interests: Optional[str], expected_pages:
             "differentiation": "string?",
             "references": ["string"],
         },
-        "section_guidance": [
-            "Brief history",
-            "Strategy and future outlook (growth areas)",
-            "Key products and revenue streams",
-            "Peers and competitive differentiation",
-            "Values and culture",
-            "Public reviews summary (e.g., Glassdoor)",
-        ],
+        "section_guidance": _SECTION_GUIDANCE,
         "style": "Terse, structured, McKinsey-style; avoid fluff."
     }
     return [
-        {"role": "system", "content": system},
+        {"role": "system", "content": _SYSTEM_PROMPT},
         {"role": "user", "content": json.dumps(user)},
     ]
 
 
+def _build_section_prompt(company_title: str, interests: Optional[str], expected_pages: int,
+                          guidance: str, docs: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    user = {
+        "company": company_title,
+        "section": guidance,
+        "interests": interests or "",
+        "target_words": max(80, expected_pages * 400 // len(SECTION_SPECS)),
+        "documents": docs,
+        "output_format": {"content": "markdown string", "sources": ["string"]},
+        "style": "Terse, structured, McKinsey-style; avoid fluff. Cover only this section.",
+    }
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(user)},
+    ]
+
+
+def _prepare_prompt(company_title: str,
+                    interests: Optional[str],
+                    expected_pages: int,
+                    docs: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    # Runs on the CPU pool: tokenizing, dedupe and ranking are all CPU-bound
+    queries = [f"{company_title} {g}" for g in _SECTION_GUIDANCE]
+    if interests:
+        queries.append(interests)
+    packed, stats = pack_documents(docs, queries, token_budget(expected_pages))
+    messages = _build_prompt(company_title, interests, expected_pages, packed)
+    stats["prompt_tokens"] = sum(count_tokens(m["content"]) for m in messages)
+    return messages, stats
+
+
+def _prepare_section_prompts(company_title: str,
+                             interests: Optional[str],
+                             expected_pages: int,
+                             docs: List[Dict[str, str]]) -> Dict[str, Optional[SectionPrompt]]:
+    # Documents are chunked and deduplicated once; each section then gets an
+    # equal share of the report's budget, ranked for that section only. A
+    # section whose packing fails maps to None and falls back on its own.
+    index = ChunkIndex(docs)
+    budget = token_budget(expected_pages) // len(SECTION_SPECS)
+    prepared: Dict[str, Optional[SectionPrompt]] = {}
+    for key, guidance, _ in SECTION_SPECS:
+        queries = [f"{company_title} {guidance}"]
+        if interests:
+            queries.append(interests)
+        try:
+            packed, stats = index.pack(queries, budget)
+            messages = _build_section_prompt(company_title, interests, expected_pages, guidance, packed)
+            stats["prompt_tokens"] = sum(count_tokens(m["content"]) for m in messages)
+            prepared[key] = (messages, stats)
+        except Exception:
+            prepared[key] = None
+    return prepared
+
+
+def _sha256(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _fingerprint(docs: List[Dict[str, str]]) -> str:
+    return _sha256([[d["url"], hashlib.sha256(d["content"].encode("utf-8")).hexdigest()] for d in docs])
+
+
+def completion_key(messages: List[Dict[str, str]]) -> str:
+    """Cache key for a completion: model, temperature, normalized prompt and document fingerprint.
+
+    Documents are pulled out of JSON message bodies and fingerprinted by
+    content, so key order and whitespace in the prompt do not split entries.
+    """
+    prompt = []
+    docs: List[Dict[str, str]] = []
+    for m in messages:
+        try:
+            body = json.loads(m["content"])
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            body = dict(body)
+            docs.extend(body.pop("documents", []))
+            prompt.append([m["role"], body])
+        else:
+            prompt.append([m["role"], " ".join(m["content"].split())])
+    return _sha256({
+        "model": settings.llm_model,
+        "temperature": _TEMPERATURE,
+        "prompt": _sha256(prompt),
+        "documents": _fingerprint(docs),
+    })
+
+
+def _section_reuse_key(company_title: str, guidance: str, docs: List[Dict[str, str]]) -> str:
+    # Ignores interests and length, and fingerprints the unpacked source documents
+    return _sha256({
+        "model": settings.llm_model,
+        "temperature": _TEMPERATURE,
+        "company": normalize_key(company_title),
+        "section": guidance,
+        "documents": _fingerprint(docs),
+    })
+
+
+async def _cache_get(namespace: str, key: str) -> Any:
+    if not settings.cache_enabled:
+        return None
+    hit, value, _ = await research_cache.aget(namespace, key)
+    return value if hit else None
+
+
+async def _cache_set(namespace: str, key: str, value: Any) -> None:
+    if settings.cache_enabled:
+        await research_cache.aset(namespace, key, value, settings.cache_ttl_llm)
+
+
+def _coerce_sources(value: Any) -> List[str]:
+    # Models return sources as strings, {"url": ...} objects or a single string
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    sources = []
+    for source in value:
+        if isinstance(source, dict):
+            source = source.get("url")
+        if isinstance(source, str) and source.strip():
+            sources.append(source.strip())
+    return sources
+
+
 def _to_report_data(payload: Dict[str, Any]) -> ReportData:
     sections = [
         ReportSection(
             title=s.get("title", ""),
             content=s.get("content", ""),
-            sources=s.get("sources", []) or [],
+            sources=_coerce_sources(s.get("sources")),
         )
         for s in payload.get("sections", [])
     ]
@@ -131,18 +402,12 @@ def _to_report_data(payload: Dict[str, Any]) -> ReportData:
     )
 
 
-async def build_report_with_llm(company_title: str,
-                                expected_pages: int = 4,
-                                interests: Optional[str] = None,
-                                reference_urls: Optional[List[str]] = None) -> Optional[ReportData]:
-    if not settings.openai_api_key:
-        return None
-
+async def _collect_docs(company_title: str, reference_urls: Optional[List[str]]) -> List[Dict[str, str]]:
     # gather URLs
     urls = []
     if reference_urls:
         urls.extend(reference_urls)
-    urls.extend(_search_urls(company_title))
+    urls.extend(await _search_urls(company_title))
     # dedupe
     seen = set()
     unique_urls = []
@@ -150,27 +415,193 @@ async def build_report_with_llm(company_title: str,
         if u not in seen:
             seen.add(u)
             unique_urls.append(u)
+    return await _load_pages(unique_urls[:12])
+
+
+async def _gather_docs(company_title: str, reference_urls: Optional[List[str]]) -> List[Dict[str, str]]:
+    with span("llm.documents"):
+        return await _collect_docs(company_title, reference_urls)
 
-    docs = _load_pages(unique_urls[:12])
+
+async def stream_report_with_llm(company_title: str,
+                                 expected_pages: int = 4,
+                                 interests: Optional[str] = None,
+                                 reference_urls: Optional[List[str]] = None
+                                 ) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ("section", ReportSection) as each section completes, then ("report", ReportData).
+
+    Nothing is yielded after the sections if the model output is unusable.
+    """
+    if not settings.openai_api_key:
+        return
+    docs = await _gather_docs(company_title, reference_urls)
     if not docs:
-        return None
+        return
+
+    with span("llm.pack"):
+        messages, tokens = await run_cpu(_prepare_prompt, company_title, interests, expected_pages, docs)
+    key = completion_key(messages)
+    cached_text = await _cache_get("llm", key)
+    if cached_text:
+        try:
+            _to_report_data(json.loads(cached_text))
+        except Exception:
+            # Unusable entry: regenerate (and overwrite) instead of failing on every run
+            cached_text = None
+    tokens["cache"] = "hit" if cached_text else "miss"
 
-    client = OpenAI(api_key=settings.openai_api_key)
-    messages = _build_prompt(company_title, interests, expected_pages, docs)
+    async def _deltas() -> AsyncIterator[str]:
+        if cached_text:
+            yield cached_text
+            return
+        try:
+            stream = await get_openai_client().chat.completions.create(
+                model=settings.llm_model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=_TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    tokens["usage_prompt_tokens"] = chunk.usage.prompt_tokens
+                    tokens["usage_completion_tokens"] = chunk.usage.completion_tokens
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except Exception as exc:
+            _record_openai(exc)
+            raise
+        _record_openai()
 
+    parser = SectionStream()
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.2,
-        )
-        content = completion.choices[0].message.content or "{}"
-        payload = json.loads(content)
+        with span("llm.completion"):
+            async for delta in _deltas():
+                for section in parser.feed(delta):
+                    if isinstance(section, dict) and section.get("title"):
+                        yield "section", ReportSection(title=section.get("title", ""),
+                                                       content=section.get("content", "") or "",
+                                                       sources=_coerce_sources(section.get("sources")))
+        payload = json.loads(parser.buffer or "{}")
+        report = _to_report_data(payload)
+    except Exception:
+        return
+    if not cached_text:
+        await _cache_set("llm", key, parser.buffer)
+    report.meta["llm_tokens"] = tokens
+    yield "report", report
+
+
+def _cached_section(title: str, value: Any) -> Optional[ReportSection]:
+    # Entries that no longer validate count as misses and get overwritten
+    if not isinstance(value, dict) or not value.get("content"):
+        return None
+    try:
+        return ReportSection(title=title, content=value["content"], sources=_coerce_sources(value.get("sources")))
     except Exception:
         return None
 
+
+async def _generate_section(key: str,
+                            guidance: str,
+                            title: str,
+                            company_title: str,
+                            docs: List[Dict[str, str]],
+                            prompt: Optional[SectionPrompt],
+                            semaphore: asyncio.Semaphore) -> Tuple[str, Optional[ReportSection], Dict[str, Any]]:
+    if prompt is None:
+        return key, None, {}
+    messages, tokens = prompt
+    cache_key = completion_key(messages)
+    reuse_key = _section_reuse_key(company_title, guidance, docs) if settings.llm_cache_reuse_sections else None
+    cached_section = _cached_section(title, await _cache_get("llm", cache_key))
+    tokens["cache"] = "hit" if cached_section else "miss"
+    if cached_section is None and reuse_key:
+        cached_section = _cached_section(title, await _cache_get("llm_section", reuse_key))
+        tokens["cache"] = "reuse" if cached_section else "miss"
+    if cached_section:
+        return key, cached_section, tokens
+
     try:
-        return _to_report_data(payload)
+        async for attempt in AsyncRetrying(stop=stop_after_attempt(settings.llm_section_attempts),
+                                           wait=wait_exponential(multiplier=0.5, max=4), reraise=True):
+            with attempt:
+                async with semaphore:
+                    try:
+                        with span(f"llm.section.{key}"):
+                            completion = await asyncio.wait_for(
+                                get_openai_client().chat.completions.create(
+                                    model=settings.llm_model,
+                                    messages=messages,
+                                    response_format={"type": "json_object"},
+                                    temperature=_TEMPERATURE,
+                                ),
+                                settings.llm_section_timeout_seconds,
+                            )
+                    except Exception as exc:
+                        _record_openai(exc)
+                        raise
+                    _record_openai()
+                payload = json.loads(completion.choices[0].message.content or "{}")
+                content = (payload.get("content") or "").strip()
+                if not content:
+                    raise ValueError(f"Empty {key} section")
+                section = ReportSection(title=title, content=content, sources=_coerce_sources(payload.get("sources")))
     except Exception:
-        return None
\ No newline at end of file
+        return key, None, tokens
+    if completion.usage:
+        tokens["usage_prompt_tokens"] = completion.usage.prompt_tokens
+        tokens["usage_completion_tokens"] = completion.usage.completion_tokens
+    cached = {"content": section.content, "sources": section.sources}
+    await _cache_set("llm", cache_key, cached)
+    if reuse_key:
+        await _cache_set("llm_section", reuse_key, cached)
+    return key, section, tokens
+
+
+async def stream_sections_with_llm(company_title: str,
+                                   expected_pages: int = 4,
+                                   interests: Optional[str] = None,
+                                   reference_urls: Optional[List[str]] = None
+                                   ) -> AsyncIterator[Tuple[str, Optional[ReportSection], Dict[str, Any]]]:
+    """Generate each SECTION_SPECS entry as its own concurrent completion.
+
+    Yields (key, section, token stats) in completion order; section is None
+    when that section failed after its retries.
+    """
+    if not settings.openai_api_key:
+        return
+    docs = await _gather_docs(company_title, reference_urls)
+    if not docs:
+        return
+
+    try:
+        with span("llm.pack"):
+            prompts = await run_cpu(_prepare_section_prompts, company_title, interests, expected_pages, docs)
+    except Exception:
+        prompts = {}
+
+    semaphore = asyncio.Semaphore(settings.llm_section_concurrency)
+    tasks = [
+        asyncio.ensure_future(_generate_section(key, guidance, title, company_title, docs, prompts.get(key),
+                                                semaphore))
+        for key, guidance, title in SECTION_SPECS
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def build_report_with_llm(company_title: str,
+                                expected_pages: int = 4,
+                                interests: Optional[str] = None,
+                                reference_urls: Optional[List[str]] = None) -> Optional[ReportData]:
+    async for kind, value in stream_report_with_llm(company_title, expected_pages, interests, reference_urls):
+        if kind == "report":
+            return value
+    return None
\ No newline at end of file
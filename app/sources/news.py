@@ -1,14 +1,15 @@
 from typing import Optional
 import os
 import textwrap
-import httpx
 from ..config import settings
+from ..utils.cache import cached, note_degraded
+from ..utils.http import fetch_json
 
 
+@cached("news")
 async def summarize_recent_news(company_title: str) -> Optional[str]:
     if not settings.newsapi_key:
         return None
-    url = "https://newsapi.org/v2/everything"
     params = {
         "q": company_title,
         "language": "en",
@@ -17,11 +18,9 @@ async def summarize_recent_news(company_title: str) -> Optional[str]:
         "apiKey": settings.newsapi_key,
     }
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+        data = await fetch_json(settings.newsapi_url, params=params)
     except Exception:
+        note_degraded()
         return None
 
     articles = data.get("articles", [])
@@ -1,30 +1,17 @@
 from typing import Optional
-from duckduckgo_search import DDGS
-import trafilatura
+import asyncio
+from ..utils.cache import cached
+from ..utils.pages import fetch_page_text
+from ..utils.search import search_links
 
 
+@cached("reviews")
 async def summarize_public_reviews(company_title: str) -> Optional[str]:
     query = f"{company_title} Glassdoor reviews"
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=3))
-    except Exception:
-        results = []
+    urls = await search_links(query, max_results=3)
 
-    snippets = []
-    for r in results:
-        url = r.get("link")
-        if not url:
-            continue
-        try:
-            downloaded = trafilatura.fetch_url(url)
-            if not downloaded:
-                continue
-            text = trafilatura.extract(downloaded, include_comments=False, include_formatting=False)
-            if text:
-                snippets.append(text[:600])
-        except Exception:
-            continue
+    texts = await asyncio.gather(*(fetch_page_text(url) for url in urls))
+    snippets = [text[:600] for text in texts if text]
 
     if not snippets:
         return None
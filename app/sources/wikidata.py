@@ -1,6 +1,185 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import re
+from ..config import settings
+from ..utils.cache import note_degraded, research_cache
+from ..utils.http import fetch_json
 
+# Properties pulled for every entity, fetched in one SPARQL round trip
+_PROPERTIES = {
+    "ceo": "P169",
+    "chairperson": "P488",
+    "founder": "P112",
+    "industry": "P452",
+    "inception": "P571",
+    "employees": "P1128",
+    "headquarters": "P159",
+    "website": "P856",
+    "logo": "P154",
+    "product": "P1056",
+}
 
-async def enrich_with_wikidata(company_title: str) -> Optional[Dict[str, Any]]:
-    # Placeholder for future SPARQL-based enrichment
-    return None
\ No newline at end of file
+# Yahoo Finance symbol suffix by exchange label
+_YAHOO_SUFFIX = {
+    "nasdaq": "",
+    "new york stock exchange": "",
+    "nyse american": "",
+    "london stock exchange": ".L",
+    "tokyo stock exchange": ".T",
+    "euronext paris": ".PA",
+    "euronext amsterdam": ".AS",
+    "euronext brussels": ".BR",
+    "frankfurt stock exchange": ".F",
+    "xetra": ".DE",
+    "borsa italiana": ".MI",
+    "six swiss exchange": ".SW",
+    "hong kong stock exchange": ".HK",
+    "toronto stock exchange": ".TO",
+    "australian securities exchange": ".AX",
+    "korea exchange": ".KS",
+    "national stock exchange of india": ".NS",
+    "bombay stock exchange": ".BO",
+    "stockholm stock exchange": ".ST",
+    "shanghai stock exchange": ".SS",
+    "shenzhen stock exchange": ".SZ",
+}
+
+_QID = re.compile(r"^Q\d+$")
+
+
+def _query(qids: List[str]) -> str:
+    items = " ".join(f"wd:{q}" for q in qids)
+    fields = " ".join(f'("{name}" wdt:{pid})' for name, pid in _PROPERTIES.items())
+    return f"""
+SELECT ?item ?field ?value ?valueLabel ?exchangeLabel ?ticker WHERE {{
+  VALUES ?item {{ {items} }}
+  {{
+    VALUES (?field ?pred) {{ {fields} }}
+    ?item ?pred ?value .
+  }} UNION {{
+    ?item p:P414 ?listing .
+    ?listing ps:P414 ?exchange ; pq:P249 ?ticker .
+    BIND("listing" AS ?field)
+  }}
+  SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
+}}"""
+
+
+def yahoo_symbol(symbol: str, exchange: str) -> Optional[str]:
+    suffix = _YAHOO_SUFFIX.get(exchange.lower())
+    return None if suffix is None else symbol.upper() + suffix
+
+
+def _format_date(value: str) -> str:
+    # Wikidata times look like 1976-04-01T00:00:00Z; year-precision dates end in -01-01
+    date = value.lstrip("+")[:10]
+    return date[:4] if date.endswith("-01-01") else date
+
+
+def _shape(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not rows:
+        # Unknown QID or no statements: nothing worth caching
+        return None
+    values: Dict[str, List[str]] = {}
+    tickers: List[Dict[str, str]] = []
+    for row in rows:
+        field = row["field"]["value"]
+        if field == "listing":
+            symbol = row["ticker"]["value"]
+            exchange = row.get("exchangeLabel", {}).get("value", "")
+            ticker = {"symbol": symbol, "exchange": exchange}
+            yahoo = yahoo_symbol(symbol, exchange)
+            if yahoo:
+                ticker["yahoo"] = yahoo
+            if ticker not in tickers:
+                tickers.append(ticker)
+            continue
+        label = row.get("valueLabel", row["value"])["value"]
+        if field in {"website", "logo", "inception", "employees"}:
+            label = row["value"]["value"]
+        if _QID.match(label):
+            continue
+        bucket = values.setdefault(field, [])
+        if label not in bucket:
+            bucket.append(label)
+
+    leaders = [f"{n} (CEO)" for n in values.get("ceo", [])]
+    leaders += [f"{n} (Chair)" for n in values.get("chairperson", []) if f"{n} (CEO)" not in leaders]
+    named = {leader.rsplit(" (", 1)[0] for leader in leaders}
+    leaders += [f"{n} (Founder)" for n in values.get("founder", []) if n not in named]
+    employees = None
+    if values.get("employees"):
+        employees = f"{max(int(float(v)) for v in values['employees']):,}"
+    return {
+        "leaders": leaders,
+        "industry": ", ".join(values.get("industry", [])) or None,
+        "founded": _format_date(min(values["inception"])) if values.get("inception") else None,
+        "employees": employees,
+        "headquarters": ", ".join(values.get("headquarters", [])) or None,
+        "website": next(iter(values.get("website", [])), None),
+        "logo_url": next(iter(values.get("logo", [])), None),
+        "products": values.get("product", []),
+        "tickers": tickers,
+    }
+
+
+async def resolve_qid(company_title: str) -> Optional[str]:
+    params = {
+        "action": "wbgetentities",
+        "sites": "enwiki",
+        "titles": company_title,
+        "normalize": 1,
+        "props": "info",
+        "format": "json",
+    }
+    try:
+        data = await fetch_json(settings.wikidata_api_url, params=params)
+    except Exception:
+        note_degraded()
+        return None
+    return next((q for q in data.get("entities", {}) if _QID.match(q)), None)
+
+
+async def fetch_entities(qids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Structured company facts for many QIDs, via the entity cache and one batched SPARQL query."""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for qid in dict.fromkeys(qids):
+        hit, entity, _ = await research_cache.aget("wikidata", qid) if settings.cache_enabled else (False, None, 0)
+        if hit:
+            found[qid] = entity
+        else:
+            missing.append(qid)
+    if not missing:
+        return found
+
+    try:
+        data = await fetch_json(
+            settings.wikidata_sparql_url,
+            params={"query": _query(missing), "format": "json"},
+            headers={"Accept": "application/sparql-results+json"},
+            timeout_seconds=settings.wikidata_timeout_seconds,
+        )
+    except Exception:
+        note_degraded()
+        return found
+
+    rows_by_item: Dict[str, List[Dict[str, Any]]] = {q: [] for q in missing}
+    for row in data.get("results", {}).get("bindings", []):
+        qid = row["item"]["value"].rsplit("/", 1)[-1]
+        rows_by_item.setdefault(qid, []).append(row)
+    for qid, rows in rows_by_item.items():
+        entity = _shape(rows)
+        if entity is None:
+            continue
+        found[qid] = entity
+        if settings.cache_enabled:
+            await research_cache.aset("wikidata", qid, entity, settings.cache_ttl_wikidata)
+    return found
+
+
+async def enrich_with_wikidata(company_title: str, qid: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    qid = qid or await resolve_qid(company_title)
+    if not qid:
+        return None
+    entity = (await fetch_entities([qid])).get(qid)
+    return {"qid": qid, **entity} if entity else None
\ No newline at end of file
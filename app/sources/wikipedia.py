@@ -1,9 +1,14 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List, Optional
 import re
-import wikipedia
-from bs4 import BeautifulSoup
-from ..utils.http import fetch_text
+from ..config import settings
+from ..utils.cache import cached
+from ..utils.http import fetch_json
+from ..utils.lazy import LazyModule
+from .wikidata import enrich_with_wikidata
+from ..utils.workers import run_cpu
+
+lxml_html = LazyModule("lxml.html")
 
 
 @dataclass
@@ -25,70 +30,141 @@ class Overview:
     differentiation: str | None = None
     values: str | None = None
     sources: List[str] = field(default_factory=list)
+    wikidata_id: str | None = None
+    tickers: List[Dict[str, str]] = field(default_factory=list)
 
 
 def _slugify(title: str) -> str:
     return re.sub(r"[^a-z0-9-]", "", title.lower().replace(" ", "-"))
 
 
-async def _fetch_infobox(title: str) -> dict:
-    url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-    html = await fetch_text(url)
-    soup = BeautifulSoup(html, "lxml")
-    infobox = soup.select_one("table.infobox.vcard, table.infobox")
+async def _fetch_article(title: str) -> dict:
+    # One parse API call returns the canonical title, rendered HTML and page props
+    params = {
+        "action": "parse",
+        "page": title,
+        "prop": "text|properties",
+        "redirects": 1,
+        "disableeditsection": 1,
+        "disabletoc": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    # Fetch errors propagate so a failed lookup is never cached as an empty overview
+    data = await fetch_json(settings.wikipedia_api_url, params=params)
+    parsed = data.get("parse")
+    if not parsed or not parsed.get("text"):
+        return {}
+    article = await run_cpu(_parse_article, parsed["text"])
+    article["title"] = parsed.get("title") or title
+    article["properties"] = parsed.get("properties") or {}
+    return article
+
+
+def _text(el) -> str:
+    return " ".join(t.strip() for t in el.itertext() if t.strip())
+
+
+def _heading(el) -> str | None:
+    # Newer MediaWiki wraps headings in <div class="mw-heading mw-heading2">
+    if el.tag == "h2":
+        return _text(el)
+    if el.tag == "div" and "mw-heading2" in (el.get("class") or ""):
+        h2 = el.find("h2")
+        return _text(h2 if h2 is not None else el)
+    return None
+
+
+def _parse_article(html: str) -> dict:
+    root = lxml_html.fromstring(html)
+    for junk in root.xpath('//sup[contains(@class, "reference")] | //style | //span[@class="mw-editsection"]'):
+        junk.drop_tree()
+    containers = root.xpath('//div[contains(@class, "mw-parser-output")]')
+    container = containers[0] if containers else root
+
+    # Lead paragraphs become the summary; later top-level sections are kept by heading
+    lead: List[str] = []
+    sections: dict = {}
+    current: str | None = None
+    for el in container.iterchildren():
+        heading = _heading(el)
+        if heading is not None:
+            current = heading.lower()
+            sections.setdefault(current, [])
+            continue
+        if el.tag not in {"p", "ul", "ol"}:
+            continue
+        text = _text(el)
+        if not text:
+            continue
+        if current is None:
+            if el.tag == "p":
+                lead.append(text)
+        else:
+            sections[current].append(text)
+
+    return {
+        "summary": "\n\n".join(lead) or None,
+        "sections": {k: "\n\n".join(v) for k, v in sections.items() if v},
+        "infobox": _parse_infobox(container),
+    }
+
+
+def _parse_infobox(container) -> dict:
+    tables = container.xpath('.//table[contains(concat(" ", normalize-space(@class), " "), " infobox ")][1]')
     data = {}
-    if not infobox:
+    if not tables:
         return data
-    for row in infobox.select("tr"):
+    infobox = tables[0]
+    for row in infobox.xpath("./tbody/tr | ./tr"):
         header = row.find("th")
         cell = row.find("td")
-        if not header or not cell:
+        if cell is None:
+            continue
+        if header is None:
+            # The logo sits in a header-less image row
+            if "logo_url" not in data and "infobox-image" in (cell.get("class") or ""):
+                src = next(iter(cell.xpath(".//img/@src")), None)
+                if src:
+                    data["logo_url"] = ("https:" + src) if src.startswith("//") else src
             continue
-        key = header.get_text(strip=True).lower()
-        val = cell.get_text(" ", strip=True)
-        data[key] = val
+        key = "".join(t.strip() for t in header.itertext()).lower()
+        # Keep list items on separate lines so leaders/products split cleanly
+        items = cell.xpath(".//li")
+        data[key] = "\n".join(_text(li) for li in items) if items else _text(cell)
         if key in {"website"}:
-            link = cell.find("a")
-            if link and link.get("href", "").startswith("http"):
-                data["website_url"] = link.get("href")
+            href = next(iter(cell.xpath('.//a[starts-with(@href, "http")]/@href')), None)
+            if href:
+                data["website_url"] = href
         if key in {"logo"}:
-            img = cell.find("img")
-            if img and img.get("src"):
-                data["logo_url"] = ("https:" + img.get("src")) if img.get("src").startswith("//") else img.get("src")
+            src = next(iter(cell.xpath(".//img/@src")), None)
+            if src:
+                data["logo_url"] = ("https:" + src) if src.startswith("//") else src
     return data
 
 
-def _extract_list_from_section(text: str) -> List[str]:
-    items = []
-    for line in text.splitlines():
-        if line.strip().startswith(('- ', '* ')):
-            items.append(line.strip()[2:].strip())
-    return items
-
-
-async def get_company_overview(title: str) -> Overview:
-    # Wikipedia summary
-    try:
-        page = wikipedia.page(title, auto_suggest=False)
-    except Exception:
-        try:
-            # fallback with auto suggest
-            page = wikipedia.page(title, auto_suggest=True)
-        except Exception:
-            page = None
-
-    summary = page.summary if page and getattr(page, 'summary', None) else None
-    url = page.url if page and getattr(page, 'url', None) else f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-
-    # Infobox parse
-    infobox = await _fetch_infobox(title)
-
-    # Heuristic sections from summary
-    history = None
+@cached("wikipedia")
+async def get_company_overview(title: str) -> Optional[Overview]:
+    # Summary, infobox and section text all come from a single page fetch
+    article = await _fetch_article(title)
+    if not article:
+        return None
+    page_title = article.get("title") or title
+    url = f"https://en.wikipedia.org/wiki/{page_title.replace(' ', '_')}"
+    infobox = article.get("infobox") or {}
+    sections = article.get("sections") or {}
+    summary = None if "disambiguation" in article.get("properties", {}) else article.get("summary")
+
+    # Structured facts from Wikidata take precedence over scraped infobox text
+    qid = article.get("properties", {}).get("wikibase_item")
+    wd = (await enrich_with_wikidata(page_title, qid) if qid else None) or {}
+
+    # Heuristic sections from article text
+    history = next((text[:2500] for name, text in sections.items() if "history" in name), None)
     strategy = None
     values = None
-    leaders: List[str] = []
-    products: List[str] = []
+    leaders: List[str] = list(wd.get("leaders", []))
+    products: List[str] = list(wd.get("products", []))
 
     # Attempt to parse leaders and products from infobox fields
     for key, field_names in {
@@ -105,36 +181,42 @@ async def get_company_overview(title: str) -> Overview:
                 else:
                     products.extend(values_list)
 
-    industry = None
+    industry = wd.get("industry")
     for fname in ["industry", "type", "genre"]:
+        if industry:
+            break
         if fname in infobox:
             industry = infobox[fname]
             break
 
-    location = None
+    location = wd.get("headquarters")
     for fname in ["headquarters", "headquarters location", "based in", "located in"]:
+        if location:
+            break
         if fname in infobox:
             location = infobox[fname]
             break
 
     overview = Overview(
-        company_title=page.title if page else title,
-        slug=_slugify(page.title if page else title),
+        company_title=page_title,
+        slug=_slugify(page_title),
         summary=summary,
         history=history,
         leaders=list(dict.fromkeys(leaders))[:10],
         products=list(dict.fromkeys(products))[:12],
         industry=industry,
         location=location,
-        founded=infobox.get("founded") if infobox else None,
-        employees=infobox.get("number of employees") if infobox else None,
-        website=infobox.get("website_url") or infobox.get("website"),
-        logo_url=infobox.get("logo_url"),
+        founded=wd.get("founded") or infobox.get("founded"),
+        employees=wd.get("employees") or infobox.get("number of employees"),
+        website=wd.get("website") or infobox.get("website_url") or infobox.get("website"),
+        logo_url=infobox.get("logo_url") or wd.get("logo_url"),
         strategy=strategy,
         peers=[],
         differentiation=None,
         values=values,
-        sources=[url],
+        sources=[url] + ([f"https://www.wikidata.org/wiki/{qid}"] if wd else []),
+        wikidata_id=qid if wd else None,
+        tickers=wd.get("tickers", []),
     )
 
     return overview
\ No newline at end of file
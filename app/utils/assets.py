@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import html
+import io
+import re
+from ..config import settings
+from .cache import cached, note_degraded
+from .http import stream
+from .lazy import LazyModule
+from .workers import run_cpu
+
+Image = LazyModule("PIL.Image")
+
+# Remote images WeasyPrint would load: <img src> and CSS url() in inline styles
+_REMOTE_ASSET = re.compile(r"""<img\b[^>]*?\ssrc=["'](https?://[^"']+)["']|url\(\s*["']?(https?://[^"')]+)""",
+                           re.IGNORECASE)
+_SVG_START = re.compile(rb"^\s*(<\?xml[^>]*>\s*)?(<!--.*?-->\s*)*<svg\b", re.DOTALL)
+
+
+@dataclass
+class Asset:
+    url: str
+    mime_type: str
+    data: bytes
+    original_bytes: int
+
+
+def remote_assets(page: str) -> List[str]:
+    """Remote URLs a rendered report would load, in document order."""
+    urls = [html.unescape(a or b) for a, b in _REMOTE_ASSET.findall(page)]
+    return list(dict.fromkeys(urls))[:settings.asset_max_per_report]
+
+
+def optimize_image(data: bytes, max_px: int, quality: int) -> Tuple[str, bytes]:
+    """Downscale to max_px on the longest side and re-encode: JPEG sources stay
+    JPEG, everything else (logos, transparency) becomes PNG; the original wins
+    if it is smaller."""
+    if _SVG_START.match(data[:2048]):
+        # Vector: scales for free and is usually tiny
+        return "image/svg+xml", data
+    with Image.open(io.BytesIO(data)) as img:
+        original_mime = Image.MIME.get(img.format or "", "application/octet-stream")
+        resized = max(img.size) > max_px
+        flat = img.mode in {"RGB", "CMYK", "YCbCr", "L"} and "transparency" not in img.info
+        photo = flat and img.format == "JPEG"
+        img = img.convert(("L" if img.mode == "L" else "RGB") if flat else "RGBA")
+        if resized:
+            img.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        if photo:
+            img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            mime = "image/jpeg"
+        else:
+            img.save(out, "PNG", optimize=True)
+            mime = "image/png"
+    if not resized and out.tell() >= len(data):
+        return original_mime, data
+    return mime, out.getvalue()
+
+
+@cached("asset", key=lambda url: url)
+async def fetch_asset(url: str) -> Optional[Asset]:
+    # Streamed so an oversized image is abandoned at the limit, not downloaded in full
+    body = bytearray()
+    try:
+        async with stream("GET", url, timeout=settings.asset_timeout_seconds) as resp:
+            length = resp.headers.get("content-length", "")
+            if resp.status_code >= 400 or (length.isdigit() and int(length) > settings.asset_max_bytes):
+                return None
+            async for chunk in resp.aiter_bytes():
+                body += chunk
+                if len(body) > settings.asset_max_bytes:
+                    return None
+    except Exception:
+        note_degraded()
+        return None
+    if not body:
+        return None
+    try:
+        mime, data = await run_cpu(optimize_image, bytes(body), settings.asset_max_px, settings.asset_jpeg_quality)
+    except Exception:
+        # Not an image Pillow can read
+        return None
+    return Asset(url=url, mime_type=mime, data=data, original_bytes=len(body))
+
+
+async def load_assets(urls: Iterable[str]) -> Dict[str, Asset]:
+    """Fetch (or read from cache) every URL concurrently; failed ones are left out."""
+    urls = list(dict.fromkeys(urls))
+    found = await asyncio.gather(*(fetch_asset(u) for u in urls))
+    return {u: a for u, a in zip(urls, found) if a is not None}
\ No newline at end of file
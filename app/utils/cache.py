@@ -0,0 +1,238 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import functools
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from ..config import settings
+from .singleflight import flights
+from .workers import run_blocking
+
+# Bump when the shape of cached source data changes; the on-disk tier is
+# dropped on version mismatch and derived caches key on it
+SOURCE_DATA_VERSION = 3
+
+_source_expiry: ContextVar[Optional[List[float]]] = ContextVar("source_expiry", default=None)
+# Set while a cached source function runs: whether it swallowed an upstream failure
+_source_failed: ContextVar[Optional[List[bool]]] = ContextVar("source_failed", default=None)
+
+
+def normalize_key(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value)).strip().lower()
+
+
+class ResearchCache:
+    """Two-tier TTL cache: an in-process LRU in front of a size-bounded SQLite file."""
+
+    def __init__(self, path: str, memory_entries: int, max_disk_bytes: int):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.counters: Dict[str, int] = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SOURCE_DATA_VERSION:
+                db.execute("DROP TABLE IF EXISTS entries")
+                db.execute(f"PRAGMA user_version = {SOURCE_DATA_VERSION}")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            self._db = db
+        return self._db
+
+    def _count(self, namespace: str, tier: str, outcome: str) -> None:
+        name = f"{namespace}.{tier}.{outcome}"
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any, float]:
+        found = self._get_memory(namespace, key)
+        return found if found[0] else self._get_disk(namespace, key)
+
+    def _get_memory(self, namespace: str, key: str) -> Tuple[bool, Any, float]:
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._memory.move_to_end((namespace, key))
+                    self._count(namespace, "memory", "hit")
+                    return True, entry[1], entry[0]
+                del self._memory[(namespace, key)]
+            self._count(namespace, "memory", "miss")
+            return False, None, 0.0
+
+    def _get_disk(self, namespace: str, key: str) -> Tuple[bool, Any, float]:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT value, expires_at, size FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                self._count(namespace, "disk", "miss")
+                return False, None, 0.0
+            blob, expires_at, size = row
+            if expires_at <= now:
+                db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._disk_bytes -= size
+                self._count(namespace, "disk", "miss")
+                return False, None, 0.0
+            db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+            value = pickle.loads(blob)
+            self._remember(namespace, key, expires_at, value)
+            self._count(namespace, "disk", "hit")
+            return True, value, expires_at
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> float:
+        now = time.time()
+        expires_at = now + ttl_seconds
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(namespace, key, expires_at, value)
+            db = self._conn()
+            old = db.execute(
+                "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, expires_at, now, len(blob)),
+            )
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict(db, now)
+        return expires_at
+
+    def _remember(self, namespace: str, key: str, expires_at: float, value: Any) -> None:
+        self._memory[(namespace, key)] = (expires_at, value)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        # Expired rows go first, then least recently used down to 90% of the budget
+        db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = int(self.max_disk_bytes * 0.9)
+        rows = db.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+        for namespace, key, size in rows:
+            if self._disk_bytes <= target:
+                break
+            db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self._memory.pop((namespace, key), None)
+            self._disk_bytes -= size
+            self._count(namespace, "disk", "eviction")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "counters": dict(self.counters),
+        }
+
+    async def aget(self, namespace: str, key: str) -> Tuple[bool, Any, float]:
+        # Memory hits are answered inline; only the SQLite tier goes to a thread
+        found = self._get_memory(namespace, key)
+        return found if found[0] else await run_blocking(self._get_disk, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> float:
+        return await run_blocking(self.set, namespace, key, value, ttl_seconds)
+
+
+research_cache = ResearchCache(
+    path=os.path.join(settings.cache_dir, "research.sqlite3"),
+    memory_entries=settings.cache_memory_entries,
+    max_disk_bytes=settings.cache_max_disk_mb * 1024 * 1024,
+)
+
+
+@contextmanager
+def track_source_expiry() -> Iterator[List[float]]:
+    """Collect expiry times of every cached source entry used in this context."""
+    expiries: List[float] = []
+    token = _source_expiry.set(expiries)
+    try:
+        yield expiries
+    finally:
+        _source_expiry.reset(token)
+
+
+def _note_expiry(expires_at: float) -> None:
+    expiries = _source_expiry.get()
+    if expiries is not None:
+        expiries.append(expires_at)
+
+
+def note_degraded() -> None:
+    """Record that a source failed in this context, so a report built on it is
+    cached only briefly and a cached source result built on it not at all."""
+    failed = _source_failed.get()
+    if failed is not None:
+        failed.append(True)
+    _note_expiry(time.time() + settings.cache_ttl_degraded_report)
+
+
+def cached(namespace: str, key: Optional[Callable[..., str]] = None):
+    """Cache an async source function under settings.cache_ttl_<namespace>.
+
+    The key defaults to the normalized first argument (the company title).
+    Concurrent misses for the same key share one upstream call. Empty
+    results are not stored so transient upstream failures are retried, and
+    neither is a result the function built after swallowing a failure (a
+    host guard rejection, a timeout, ...) by calling note_degraded().
+    """
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            k = key(*args, **kwargs) if key else normalize_key(args[0] if args else next(iter(kwargs.values())))
+            if not settings.cache_enabled:
+                return await flights.do((namespace, k), lambda: fn(*args, **kwargs))
+            hit, value, expires_at = await research_cache.aget(namespace, k)
+            if hit:
+                _note_expiry(expires_at)
+                return value
+
+            async def _load() -> Tuple[Any, Optional[float], bool]:
+                failed: List[bool] = []
+                token = _source_failed.set(failed)
+                try:
+                    loaded = await fn(*args, **kwargs)
+                finally:
+                    _source_failed.reset(token)
+                if failed or loaded is None or loaded == "" or loaded == {} or loaded == []:
+                    return loaded, None, bool(failed)
+                ttl = getattr(settings, f"cache_ttl_{namespace}")
+                return loaded, await research_cache.aset(namespace, k, loaded, ttl), False
+
+            value, expires_at, failed = await flights.do((namespace, k), _load)
+            if expires_at is not None:
+                _note_expiry(expires_at)
+            elif failed:
+                # Callers that shared the load see the failure too
+                note_degraded()
+            return value
+
+        return wrapper
+
+    return decorator
\ No newline at end of file
@@ -1,23 +1,104 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+import asyncio
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from ..config import settings
+from .metrics import record_upstream, status_outcome, upstream_name
+from .resilience import UpstreamUnavailableError, host_guards
 
 
-class HttpError(Exception):
-    pass
+_client: httpx.AsyncClient | None = None
+_concurrency: asyncio.Semaphore | None = None
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, max=6),
-       retry=retry_if_exception_type(HttpError))
-async def fetch_text(url: str, timeout_seconds: float = 10.0, headers: dict | None = None) -> str:
-    async with httpx.AsyncClient(timeout=timeout_seconds, follow_redirects=True, headers=headers) as client:
-        resp = await client.get(url)
-        if resp.status_code >= 400:
-            raise HttpError(f"HTTP {resp.status_code} for {url}")
-        return resp.text
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    return httpx.AsyncClient(
+        http2=settings.http2,
+        limits=limits,
+        timeout=10.0,
+        follow_redirects=True,
+        headers={"User-Agent": settings.http_user_agent},
+    )
 
 
-async def fetch_json(url: str, timeout_seconds: float = 10.0, headers: dict | None = None) -> dict:
-    async with httpx.AsyncClient(timeout=timeout_seconds, follow_redirects=True, headers=headers) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return resp.json()
\ No newline at end of file
+async def init_http_client() -> None:
+    global _client, _concurrency
+    if _client is None:
+        _client = _build_client()
+    _concurrency = asyncio.Semaphore(settings.http_max_concurrency)
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    host_guards.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    # Lazily create the pool when used outside the app lifespan (scripts, REPL)
+    global _client, _concurrency
+    if _client is None:
+        _client = _build_client()
+    if _concurrency is None:
+        _concurrency = asyncio.Semaphore(settings.http_max_concurrency)
+    return _client
+
+
+async def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Raises UpstreamUnavailableError without touching the network while the
+    host's circuit is open or its rate limit would make the call wait too long."""
+    client = get_client()
+    upstream = upstream_name(url)
+    try:
+        # The host guard is taken first so callers queued on one slow host
+        # do not hold global slots
+        async with host_guards.get(urlsplit(url).netloc.lower(), upstream).call() as call, _concurrency:
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except Exception:
+                record_upstream(upstream, "error")
+                raise
+            call.status(resp.status_code, resp.headers.get("retry-after"))
+    except UpstreamUnavailableError as exc:
+        record_upstream(upstream, exc.reason.replace(" ", "_"))
+        raise
+    record_upstream(upstream, status_outcome(resp.status_code))
+    return resp
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """Like request(), but the body is left unread so the caller can stop early."""
+    client = get_client()
+    upstream = upstream_name(url)
+    try:
+        async with host_guards.get(urlsplit(url).netloc.lower(), upstream).call() as call, _concurrency:
+            try:
+                resp = await client.send(client.build_request(method, url, **kwargs), stream=True)
+            except Exception:
+                record_upstream(upstream, "error")
+                raise
+            call.status(resp.status_code, resp.headers.get("retry-after"))
+            record_upstream(upstream, status_outcome(resp.status_code))
+            try:
+                yield resp
+            finally:
+                await resp.aclose()
+    except UpstreamUnavailableError as exc:
+        record_upstream(upstream, exc.reason.replace(" ", "_"))
+        raise
+
+
+async def fetch_json(url: str, timeout_seconds: float = 10.0, headers: dict | None = None,
+                     params: dict | None = None) -> dict:
+    resp = await request("GET", url, timeout=timeout_seconds, headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()
\ No newline at end of file
@@ -0,0 +1,42 @@
+from typing import Any, Dict
+import importlib
+import sys
+import threading
+import time
+
+_load_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def import_module(name: str) -> Any:
+    """importlib.import_module that records how long a module's first import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _load_seconds.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+def loaded() -> Dict[str, float]:
+    with _lock:
+        return dict(_load_seconds)
+
+
+class LazyModule:
+    """Stands in for a heavy module until one of its attributes is first used."""
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module: Any = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._lazy_module is None:
+            self._lazy_module = import_module(self._lazy_name)
+        return getattr(self._lazy_module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
\ No newline at end of file
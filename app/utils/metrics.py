@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set
+from urllib.parse import urlsplit
+import time
+from prometheus_client import CollectorRegistry, Counter, Histogram, ProcessCollector, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from ..config import settings
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+
+STAGE_SECONDS = Histogram(
+    "report_stage_seconds", "Wall time per report stage (sources, LLM, rendering)", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120),
+    registry=registry,
+)
+STAGE_ERRORS = Counter("report_stage_errors_total", "Report stages that raised or timed out", ["stage"],
+                       registry=registry)
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Outbound requests by upstream and outcome",
+                            ["upstream", "outcome"], registry=registry)
+REPORT_CACHE = Counter("report_cache_requests_total", "Rendered-report cache lookups", ["outcome"],
+                       registry=registry)
+
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("report_timings", default=None)
+
+
+@contextmanager
+def track_timings() -> Iterator[Dict[str, float]]:
+    """Collect span durations (seconds, summed per stage) for the report built inside the block."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    if not settings.metrics_enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        # A consumer stopped iterating a streaming stage early
+        raise
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed, 4)
+
+
+def _api_hosts() -> Set[str]:
+    urls = [settings.wikipedia_api_url, settings.wikidata_api_url, settings.wikidata_sparql_url,
+            settings.newsapi_url]
+    return {urlsplit(u).hostname or "" for u in urls}
+
+
+def upstream_name(url: str) -> str:
+    # Known APIs by host; scraped pages share one label to bound cardinality
+    host = urlsplit(url).hostname or ""
+    return host if host in _api_hosts() else "web"
+
+
+def record_upstream(upstream: str, outcome: str) -> None:
+    if settings.metrics_enabled:
+        UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+
+
+def status_outcome(status_code: int) -> str:
+    return "ok" if status_code < 400 else f"http_{status_code // 100}xx"
+
+
+class _RuntimeCollector:
+    """Reads existing in-process counters at scrape time, so the hot paths pay nothing extra."""
+
+    def describe(self):
+        # Metric names are only known at scrape time
+        return []
+
+    def collect(self):
+        # Imported here: these modules sit above utils in the import graph
+        from ..report.pdf import render_stats
+        from ..services.jobs import job_manager
+        from .cache import research_cache
+        from .pages import page_store
+        from .resilience import host_guards
+        from .singleflight import flights
+
+        requests = CounterMetricFamily("research_cache_lookups", "Research cache lookups by tier and outcome",
+                                       labels=["namespace", "tier", "outcome"])
+        ratio = GaugeMetricFamily("research_cache_hit_ratio", "Share of research cache lookups served from cache",
+                                  labels=["namespace"])
+        per_namespace: Dict[str, Dict[str, int]] = {}
+        for name, value in research_cache.stats()["counters"].items():
+            namespace, tier, outcome = name.split(".", 2)
+            requests.add_metric([namespace, tier, outcome], value)
+            per_namespace.setdefault(namespace, {})[f"{tier}.{outcome}"] = value
+        for namespace, c in per_namespace.items():
+            lookups = c.get("memory.hit", 0) + c.get("memory.miss", 0)
+            if lookups:
+                ratio.add_metric([namespace], (c.get("memory.hit", 0) + c.get("disk.hit", 0)) / lookups)
+        yield requests
+        yield ratio
+
+        pages = CounterMetricFamily("page_store_fetches", "Page store outcomes", labels=["outcome"])
+        for outcome, value in page_store.stats()["counters"].items():
+            pages.add_metric([outcome], value)
+        yield pages
+
+        coalesced = CounterMetricFamily("singleflight_calls", "Source calls by single-flight role",
+                                        labels=["source", "role"])
+        for name, value in flights.stats()["counters"].items():
+            source, role = name.rsplit(".", 1)
+            coalesced.add_metric([source, role], value)
+        yield coalesced
+        yield GaugeMetricFamily("singleflight_in_flight", "Shared source calls in flight", value=flights.in_flight())
+
+        jobs = GaugeMetricFamily("report_jobs", "Report jobs by state", labels=["state"])
+        for state, value in job_manager.stats().items():
+            jobs.add_metric([state], value)
+        yield jobs
+
+        render = GaugeMetricFamily("render_slots", "PDF render slots", labels=["state"])
+        for state, value in render_stats().items():
+            render.add_metric([state], value)
+        yield render
+
+        # Aggregated per upstream: scraped web hosts would make the host label unbounded
+        circuits: Dict[tuple, int] = {}
+        limits: Dict[str, int] = {}
+        for status in host_guards.status().values():
+            key = (status["upstream"], status["state"])
+            circuits[key] = circuits.get(key, 0) + 1
+            if status["upstream"] != "web":
+                limits[status["upstream"]] = status["concurrency_limit"]
+        breakers = GaugeMetricFamily("upstream_circuits", "Host circuit breakers by upstream and state",
+                                     labels=["upstream", "state"])
+        for (upstream, state), value in circuits.items():
+            breakers.add_metric([upstream, state], value)
+        yield breakers
+        concurrency = GaugeMetricFamily("upstream_concurrency_limit", "Adaptive per-host concurrency limit",
+                                        labels=["upstream"])
+        for upstream, value in limits.items():
+            concurrency.add_metric([upstream], value)
+        yield concurrency
+
+
+registry.register(_RuntimeCollector())
+
+
+def render_latest() -> bytes:
+    return generate_latest(registry)
\ No newline at end of file
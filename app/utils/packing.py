@@ -0,0 +1,212 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import re
+import zlib
+import numpy as np
+from ..config import settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# MinHash: 64 universal hash functions over 32-bit shingle hashes;
+# a < 2^31 keeps a * h inside uint64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_HASH_A = _rng.integers(1, _PRIME, size=64, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _PRIME, size=64, dtype=np.uint64)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(settings.llm_model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # No tokenizer files available (e.g. offline): fall back to an estimate
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _chunks(text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    # Paragraphs are merged up to max_tokens; oversized ones split on sentences.
+    # Each piece is tokenized once and a chunk's size is the sum of its pieces.
+    pieces: List[Tuple[str, int]] = []
+    for para in (p.strip() for p in text.split("\n")):
+        if not para:
+            continue
+        n = count_tokens(para)
+        if n <= max_tokens:
+            pieces.append((para, n))
+        else:
+            pieces.extend((s, count_tokens(s)) for s in _SENTENCE.split(para) if s.strip())
+
+    chunks: List[Tuple[str, int]] = []
+    current: List[str] = []
+    size = 0
+    for piece, n in pieces:
+        if current and size + n > max_tokens:
+            chunks.append(("\n".join(current), size))
+            current, size = [], 0
+        current.append(piece)
+        size += n
+    if current:
+        chunks.append(("\n".join(current), size))
+    return chunks
+
+
+def minhash(text: str, shingle: int = 5) -> Optional[np.ndarray]:
+    words = _words(text)
+    if len(words) < shingle:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(" ".join(words[i:i + shingle]).encode()) for i in range(len(words) - shingle + 1)),
+        dtype=np.uint64,
+    )
+    # (a * h + b) mod p for every hash function, minimized over the shingles
+    return ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _PRIME).min(axis=1)
+
+
+class BM25:
+    def __init__(self, docs: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.tfs = [self._counts(d) for d in docs]
+        self.lengths = np.array([len(d) for d in docs], dtype=np.float64)
+        self.avgdl = float(self.lengths.mean()) if len(docs) else 0.0
+        df: Dict[str, int] = {}
+        for tf in self.tfs:
+            for term in tf:
+                df[term] = df.get(term, 0) + 1
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    @staticmethod
+    def _counts(words: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for w in words:
+            counts[w] = counts.get(w, 0) + 1
+        return counts
+
+    def scores(self, query: List[str]) -> np.ndarray:
+        out = np.zeros(len(self.tfs), dtype=np.float64)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avgdl or 1.0))
+        for term in set(query):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.array([d.get(term, 0) for d in self.tfs], dtype=np.float64)
+            out += idf * tf * (self.k1 + 1) / (tf + norm)
+        return out
+
+
+def token_budget(expected_pages: int) -> int:
+    budget = settings.llm_context_tokens_per_page * max(1, expected_pages)
+    return max(settings.llm_context_min_tokens, min(settings.llm_context_max_tokens, budget))
+
+
+class ChunkIndex:
+    """Documents chunked, deduplicated and BM25-indexed once; pack() selects
+    chunks for one set of queries, so several prompts can share the work."""
+
+    def __init__(self, docs: List[Dict[str, str]]):
+        self.docs = docs
+        chunks: List[Tuple[int, int, str, int]] = []  # (doc index, chunk index, text, tokens)
+        source_tokens = 0
+        for d, doc in enumerate(docs):
+            for c, (text, n) in enumerate(_chunks(doc["content"], settings.llm_chunk_tokens)):
+                source_tokens += n
+                chunks.append((d, c, text, n))
+
+        kept: List[Tuple[int, int, str, int]] = []
+        # Rows are filled in as chunks are kept, so each comparison is one slice
+        signatures = np.empty((len(chunks), len(_HASH_A)), dtype=np.uint64)
+        filled = 0
+        duplicates = 0
+        for chunk in chunks:
+            sig = minhash(chunk[2])
+            if sig is not None and filled:
+                similarity = (signatures[:filled] == sig).mean(axis=1).max()
+                if similarity >= settings.llm_dedupe_threshold:
+                    duplicates += 1
+                    continue
+            if sig is not None:
+                signatures[filled] = sig
+                filled += 1
+            kept.append(chunk)
+
+        self.kept = kept
+        self.bm25 = BM25([_words(c[2]) for c in kept]) if kept else None
+        self.stats = {
+            "documents": len(docs),
+            "source_tokens": source_tokens,
+            "chunks": len(chunks),
+            "duplicate_chunks": duplicates,
+        }
+
+    def pack(self, queries: List[str], budget: int) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Chunks are picked round-robin from each query's BM25 ranking so every
+        section gets supporting material, then regrouped per source URL in
+        their original order."""
+        kept = self.kept
+        chosen: Dict[int, Tuple[int, int, str, int]] = {}
+        used = 0
+        if self.bm25 is not None:
+            rankings = []
+            for q in queries:
+                terms = [w for w in _words(q) if w not in _STOPWORDS]
+                rankings.append(list(np.argsort(-self.bm25.scores(terms), kind="stable")))
+            full = False
+            for rank in range(len(kept)):
+                for ranking in rankings:
+                    i = int(ranking[rank])
+                    if i in chosen:
+                        continue
+                    n = kept[i][3]
+                    if used + n > budget:
+                        # Smaller chunks further down may still fit
+                        continue
+                    chosen[i] = kept[i]
+                    used += n
+                    if used >= budget:
+                        full = True
+                        break
+                if full:
+                    break
+
+        by_doc: Dict[int, List[Tuple[int, str]]] = {}
+        for d, c, text, _ in chosen.values():
+            by_doc.setdefault(d, []).append((c, text))
+        packed = [
+            {"url": self.docs[d]["url"], "content": "\n\n".join(text for _, text in sorted(parts))}
+            for d, parts in sorted(by_doc.items())
+        ]
+        stats = {
+            **self.stats,
+            "selected_chunks": len(chosen),
+            "context_tokens": used,
+            "budget_tokens": budget,
+        }
+        return packed, stats
+
+
+def pack_documents(docs: List[Dict[str, str]],
+                   queries: List[str],
+                   budget: int) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """Select deduplicated, relevant chunks from docs within a token budget."""
+    return ChunkIndex(docs).pack(queries, budget)
\ No newline at end of file
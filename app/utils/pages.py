@@ -0,0 +1,245 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from ..config import settings
+from .cache import note_degraded
+from .http import request
+from .lazy import LazyModule
+from .singleflight import flights
+from .workers import run_blocking, run_cpu
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to zlib
+    zstandard = None
+
+trafilatura = LazyModule("trafilatura")
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def extract_text(html: str) -> Optional[str]:
+    return trafilatura.extract(html, include_comments=False, include_formatting=False)
+
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def max_age(headers: Any) -> Optional[float]:
+    """Freshness lifetime from Cache-Control/Expires, clamped to the page policy; None for no-store."""
+    cache_control = headers.get("cache-control", "")
+    if "no-store" in cache_control.lower():
+        return None
+    if "no-cache" in cache_control.lower():
+        return 0.0
+    found = _MAX_AGE.search(cache_control)
+    if found:
+        age = float(found.group(1))
+    elif headers.get("expires"):
+        try:
+            age = parsedate_to_datetime(headers["expires"]).timestamp() - time.time()
+        except (TypeError, ValueError):
+            age = settings.page_default_max_age_seconds
+    else:
+        age = settings.page_default_max_age_seconds
+    return max(settings.page_max_age_floor_seconds, min(settings.page_max_age_cap_seconds, age))
+
+
+class PageStore:
+    """Fetched pages on disk: raw HTML by content hash (compressed) plus its extracted text.
+
+    URLs map to a content hash and their validators, so revalidation can
+    use conditional GETs and unchanged content is never re-extracted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters: Dict[str, int] = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS contents ("
+                " hash TEXT PRIMARY KEY, codec TEXT NOT NULL, html BLOB NOT NULL, text TEXT, size INTEGER NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, hash TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+                " fetched_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS pages_hash ON pages (hash)")
+            self._db = db
+        return self._db
+
+    def count(self, outcome: str) -> None:
+        self.counters[outcome] = self.counters.get(outcome, 0) + 1
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT p.hash, p.etag, p.last_modified, p.expires_at, c.text FROM pages p"
+                " JOIN contents c ON c.hash = p.hash WHERE p.url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"hash": row[0], "etag": row[1], "last_modified": row[2], "expires_at": row[3], "text": row[4]}
+
+    def text_for(self, content_hash: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            row = self._conn().execute("SELECT text FROM contents WHERE hash = ?", (content_hash,)).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def touch(self, url: str, expires_at: float, etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self._lock:
+            self._conn().execute(
+                "UPDATE pages SET fetched_at = ?, expires_at = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), expires_at, etag, last_modified, url),
+            )
+
+    def save(self, url: str, content_hash: str, raw: Optional[bytes], text: Optional[str],
+             etag: Optional[str], last_modified: Optional[str], expires_at: float) -> None:
+        # raw is None when the content is already stored under content_hash
+        with self._lock:
+            db = self._conn()
+            if raw is not None:
+                codec, blob = _compress(raw)
+                db.execute(
+                    "INSERT OR REPLACE INTO contents (hash, codec, html, text, size) VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, codec, blob, text, len(blob) + len(text or "")),
+                )
+            db.execute(
+                "INSERT OR REPLACE INTO pages (url, hash, etag, last_modified, fetched_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content_hash, etag, last_modified, time.time(), expires_at),
+            )
+            self._prune(db)
+
+    def _prune(self, db: sqlite3.Connection) -> None:
+        # Least recently fetched URLs go first; contents no URL points at go with
+        # them. Victims are read oldest-first until enough is freed, then removed
+        # with two statements.
+        budget = settings.page_store_max_mb * 1024 * 1024
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()[0]
+        if total <= budget:
+            return
+        evicted = []
+        refs: Dict[str, int] = {}
+        oldest = db.execute(
+            "SELECT p.url, p.hash, c.size FROM pages p JOIN contents c ON c.hash = p.hash ORDER BY p.fetched_at"
+        )
+        for url, content_hash, size in oldest:
+            if total <= budget:
+                break
+            evicted.append((url,))
+            if content_hash not in refs:
+                refs[content_hash] = db.execute("SELECT COUNT(*) FROM pages WHERE hash = ?",
+                                                (content_hash,)).fetchone()[0]
+            refs[content_hash] -= 1
+            if not refs[content_hash]:
+                total -= size
+        oldest.close()
+        db.execute("BEGIN")
+        try:
+            db.executemany("DELETE FROM pages WHERE url = ?", evicted)
+            db.execute("DELETE FROM contents WHERE hash NOT IN (SELECT hash FROM pages)")
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.count("eviction")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"counters": dict(self.counters)}
+
+
+page_store = PageStore(os.path.join(settings.cache_dir, "pages.sqlite3"))
+
+
+async def _fetch(url: str, timeout_seconds: float) -> Optional[str]:
+    # Scraped pages are best-effort: no retries. Upstream failures raise, so
+    # every caller sharing the fetch sees them; a missing page yields None
+    stored = await run_blocking(page_store.lookup, url)
+    if stored and stored["expires_at"] > time.time():
+        page_store.count("fresh")
+        return stored["text"]
+
+    headers = {}
+    if stored and stored["etag"]:
+        headers["If-None-Match"] = stored["etag"]
+    if stored and stored["last_modified"]:
+        headers["If-Modified-Since"] = stored["last_modified"]
+    try:
+        resp = await request("GET", url, timeout=timeout_seconds, headers=headers)
+    except Exception:
+        if not stored:
+            raise
+        # Stale is better than nothing when the origin is unreachable
+        note_degraded()
+        return stored["text"]
+
+    lifetime = max_age(resp.headers)
+    etag, last_modified = resp.headers.get("etag"), resp.headers.get("last-modified")
+    if resp.status_code == 304 and stored:
+        page_store.count("revalidated")
+        if lifetime is not None:
+            await run_blocking(page_store.touch, url, time.time() + lifetime, etag, last_modified)
+        return stored["text"]
+    if resp.status_code == 429 or resp.status_code >= 500:
+        # Transient, unlike a missing page
+        resp.raise_for_status()
+    if resp.status_code >= 400 or not resp.content:
+        return None
+
+    content_hash = hashlib.sha256(resp.content).hexdigest()
+    known, text = await run_blocking(page_store.text_for, content_hash)
+    if known:
+        # Same bytes as a stored page: skip extraction
+        page_store.count("unchanged")
+    else:
+        page_store.count("extracted")
+        try:
+            text = await run_cpu(extract_text, resp.text)
+        except Exception:
+            text = None
+    if lifetime is not None:
+        await run_blocking(page_store.save, url, content_hash, None if known else resp.content, text,
+                           etag, last_modified, time.time() + lifetime)
+    return text
+
+
+async def fetch_page_text(url: str, timeout_seconds: float = 10.0) -> Optional[str]:
+    if not settings.cache_enabled:
+        try:
+            resp = await request("GET", url, timeout=timeout_seconds)
+        except Exception:
+            note_degraded()
+            return None
+        if resp.status_code == 429 or resp.status_code >= 500:
+            note_degraded()
+        if resp.status_code >= 400 or not resp.text:
+            return None
+        try:
+            return await run_cpu(extract_text, resp.text)
+        except Exception:
+            return None
+    try:
+        return await flights.do(("page", url), lambda: _fetch(url, timeout_seconds))
+    except Exception:
+        note_degraded()
+        return None
\ No newline at end of file
@@ -0,0 +1,282 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+import asyncio
+import time
+from ..config import settings
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised before any network I/O when a host should not be called right now."""
+
+    def __init__(self, host: str, retry_after: float, reason: str):
+        super().__init__(f"{host} is unavailable ({reason}); retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class RateLimitedError(UpstreamUnavailableError):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CallOutcome:
+    """Filled in by the caller inside HostGuard.call(); exceptions count as failures."""
+
+    def __init__(self):
+        self.failed = False
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+
+    def status(self, status_code: int, retry_after: Optional[str] = None) -> None:
+        # 429 and 5xx say something about the host; other 4xx are about the request
+        if status_code == 429 or status_code >= 500:
+            self.failed = True
+            self.throttled = status_code in (429, 503) and (status_code == 429 or retry_after is not None)
+            self.retry_after = parse_retry_after(retry_after)
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        self.failed = self.throttled = True
+        self.retry_after = retry_after
+
+
+class HostGuard:
+    """Token bucket, circuit breaker and adaptive concurrency limit for one host.
+
+    The breaker opens after consecutive failures (or at once when the host
+    throttles us) and lets a single probe through once the cooldown ends;
+    each failed probe doubles the cooldown. Concurrency moves between 1 and
+    http_max_connections_per_host: additive increase while recent latency
+    stays near the long-term average, multiplicative decrease when it rises
+    past adaptive_latency_tolerance x that baseline or a call fails. The token
+    rate halves when the host throttles and recovers gradually on success.
+    """
+
+    def __init__(self, host: str, upstream: str, rate: float, max_wait: float):
+        self.host = host
+        self.upstream = upstream
+        # Token bucket
+        self.max_wait = max_wait
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = max(1.0, rate * settings.host_rate_burst_seconds)
+        self.refilled_at = time.monotonic()
+        # Circuit breaker
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.cooldown = settings.breaker_cooldown_seconds
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        # Adaptive concurrency
+        self.limit = float(settings.http_max_connections_per_host)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.smoothed: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.counters: Dict[str, int] = {}
+
+    def _count(self, outcome: str) -> None:
+        self.counters[outcome] = self.counters.get(outcome, 0) + 1
+
+    def _admit(self) -> bool:
+        """Breaker check; True when this call is the half-open probe."""
+        if self.state == "closed":
+            return False
+        now = time.monotonic()
+        if self.state == "open" and now >= self.opened_until:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self._count("rejected_open")
+        raise CircuitOpenError(self.host, max(0.0, self.opened_until - now), "circuit open")
+
+    async def _take_token(self) -> None:
+        now = time.monotonic()
+        capacity = max(1.0, self.rate * settings.host_rate_burst_seconds)
+        self.tokens = min(capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return
+        wait = -self.tokens / self.rate
+        if wait > self.max_wait:
+            # Queueing this long would only stack up behind other callers' timeouts
+            self.tokens += 1
+            self._count("rate_limited")
+            raise RateLimitedError(self.host, wait, "rate limited")
+        await asyncio.sleep(wait)
+
+    async def _acquire_slot(self) -> None:
+        while self.in_flight >= max(1, int(self.limit)):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+    def _wake(self) -> None:
+        free = max(1, int(self.limit)) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def call(self) -> AsyncIterator[CallOutcome]:
+        if not settings.resilience_enabled:
+            await self._acquire_slot()
+            try:
+                yield CallOutcome()
+            finally:
+                self._release_slot()
+            return
+
+        probe = self._admit()
+        try:
+            await self._take_token()
+            await self._acquire_slot()
+        except BaseException:
+            if probe:
+                self.probe_in_flight = False
+            raise
+        if self.state != "closed" and not probe:
+            # The circuit opened while this call was queued
+            self._release_slot()
+            self._count("rejected_open")
+            raise CircuitOpenError(self.host, max(0.0, self.opened_until - time.monotonic()), "circuit open")
+        outcome = CallOutcome()
+        start = time.monotonic()
+        cancelled = False
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            # The caller's deadline, not a verdict on the host
+            cancelled = True
+            raise
+        except Exception:
+            outcome.failed = True
+            raise
+        finally:
+            self._release_slot()
+            if probe:
+                self.probe_in_flight = False
+            if not cancelled:
+                self._record(outcome, time.monotonic() - start, probe)
+
+    def _record(self, outcome: CallOutcome, latency: float, probe: bool) -> None:
+        self.last_latency = latency
+        if outcome.failed:
+            self._count("throttled" if outcome.throttled else "failed")
+            self.consecutive_failures += 1
+            self.limit = max(1.0, self.limit * 0.5)
+            if outcome.throttled:
+                self.rate = max(settings.host_rate_min_per_second, self.rate * 0.5)
+            if probe:
+                self.cooldown = min(settings.breaker_max_cooldown_seconds, self.cooldown * 2)
+            if probe or outcome.throttled or self.consecutive_failures >= settings.breaker_failure_threshold:
+                cooldown = self.cooldown
+                if outcome.retry_after is not None:
+                    cooldown = min(settings.breaker_max_cooldown_seconds, max(cooldown, outcome.retry_after))
+                self.state = "open"
+                self.opened_until = time.monotonic() + cooldown
+            return
+
+        self._count("ok")
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            self.state = "closed"
+            self.cooldown = settings.breaker_cooldown_seconds
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+        # Short-term against long-term average: jitter moves both, a host that
+        # is getting slower moves the short one first; a lasting change
+        # becomes the new baseline
+        self.smoothed = latency if self.smoothed is None else 0.8 * self.smoothed + 0.2 * latency
+        self.baseline = latency if self.baseline is None else 0.98 * self.baseline + 0.02 * latency
+        ceiling = float(settings.http_max_connections_per_host)
+        if self.smoothed > self.baseline * settings.adaptive_latency_tolerance:
+            self.limit = max(1.0, self.limit * 0.8)
+        else:
+            self.limit = min(ceiling, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "upstream": self.upstream,
+            "state": "half_open" if self.state == "open" and now >= self.opened_until else self.state,
+            "retry_in_seconds": round(max(0.0, self.opened_until - now), 2) if self.state == "open" else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "concurrency_limit": max(1, int(self.limit)),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rate_per_second": round(self.rate, 3),
+            "latency_baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "latency_smoothed_ms": round(self.smoothed * 1000, 1) if self.smoothed is not None else None,
+            "latency_last_ms": round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            "counters": dict(self.counters),
+        }
+
+
+class HostGuards:
+    """One HostGuard per host, least recently used healthy hosts dropped beyond resilience_max_hosts."""
+
+    def __init__(self):
+        self._guards: "OrderedDict[str, HostGuard]" = OrderedDict()
+
+    def get(self, host: str, upstream: str) -> HostGuard:
+        guard = self._guards.get(host)
+        if guard is None:
+            rate = settings.host_rate_overrides.get(host, settings.host_rate_per_second)
+            max_wait = settings.host_rate_max_wait_overrides.get(host, settings.host_rate_max_wait_seconds)
+            guard = self._guards[host] = HostGuard(host, upstream, rate, max_wait)
+            self._prune()
+        else:
+            self._guards.move_to_end(host)
+        return guard
+
+    def _prune(self) -> None:
+        excess = len(self._guards) - settings.resilience_max_hosts
+        if excess <= 0:
+            return
+        for host in [h for h, g in self._guards.items() if g.state == "closed" and not g.in_flight][:excess]:
+            del self._guards[host]
+
+    def clear(self) -> None:
+        self._guards.clear()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {host: guard.snapshot() for host, guard in self._guards.items()}
+
+
+host_guards = HostGuards()
\ No newline at end of file
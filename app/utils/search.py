@@ -0,0 +1,47 @@
+from typing import List
+from .cache import note_degraded
+from .lazy import LazyModule
+from .metrics import record_upstream
+from .resilience import UpstreamUnavailableError, host_guards
+from .singleflight import flights
+from .workers import run_blocking
+
+duckduckgo_search = LazyModule("duckduckgo_search")
+
+
+def _ddg_links(query: str, max_results: int) -> List[str]:
+    with duckduckgo_search.DDGS() as ddgs:
+        return [r.get("href") or r.get("link") or "" for r in ddgs.text(query, max_results=max_results)]
+
+
+async def _search(query: str, max_results: int) -> List[str]:
+    # The library does its own HTTP, so its host gets a guard of its own
+    try:
+        async with host_guards.get("duckduckgo.com", "duckduckgo").call() as call:
+            try:
+                links = await run_blocking(_ddg_links, query, max_results)
+            except Exception as exc:
+                if type(exc).__name__ == "RatelimitException":
+                    call.throttle()
+                raise
+    except UpstreamUnavailableError as exc:
+        record_upstream("duckduckgo", exc.reason.replace(" ", "_"))
+        raise
+    except Exception:
+        record_upstream("duckduckgo", "error")
+        raise
+    record_upstream("duckduckgo", "ok")
+    return links
+
+
+async def search_links(query: str, max_results: int = 3) -> List[str]:
+    # duckduckgo_search is synchronous, so it runs on the blocking I/O pool
+    try:
+        links = await flights.do(
+            ("search", " ".join(query.lower().split()), max_results),
+            lambda: _search(query, max_results),
+        )
+    except Exception:
+        note_degraded()
+        return []
+    return [u for u in links if u.startswith("http")]
\ No newline at end of file
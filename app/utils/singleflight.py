@@ -0,0 +1,48 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight future.
+
+    Keys are tuples whose first element names the source; counters are kept
+    per source so coalescing during traffic spikes is visible.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.counters: Dict[str, int] = {}
+
+    def _count(self, source: str, outcome: str) -> None:
+        name = f"{source}.{outcome}"
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    async def do(self, key: Tuple[Any, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is not None:
+            self._count(str(key[0]), "coalesced")
+        else:
+            self._count(str(key[0]), "leader")
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        # A caller that times out or is cancelled must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Mark the exception retrieved even if every waiter has gone away
+        if not future.cancelled():
+            future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "counters": dict(self.counters)}
+
+
+flights = SingleFlight()
\ No newline at end of file
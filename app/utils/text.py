@@ -0,0 +1,13 @@
+import re
+
+_SUFFIXES = {
+    "the", "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "llc",
+    "group", "holdings", "holding", "sa", "ag", "nv", "se", "gmbh", "spa", "ab", "asa", "oyj", "kk",
+}
+
+
+def core_name(name: str) -> str:
+    # "Apple Inc. (company)" -> "apple"
+    name = re.sub(r"\([^)]*\)", " ", name.lower())
+    words = [w for w in re.split(r"[^a-z0-9&]+", name) if w and w not in _SUFFIXES]
+    return " ".join(words)
\ No newline at end of file
@@ -0,0 +1,48 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+import asyncio
+import functools
+from ..config import settings
+
+T = TypeVar("T")
+
+_threads: ThreadPoolExecutor | None = None
+_processes: ProcessPoolExecutor | None = None
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(max_workers=settings.blocking_io_threads, thread_name_prefix="blocking")
+    return _threads
+
+
+def _cpu_pool() -> Executor:
+    # CPU-bound work shares the thread pool unless worker processes are configured
+    global _processes
+    if settings.cpu_pool_processes <= 0:
+        return _thread_pool()
+    if _processes is None:
+        _processes = ProcessPoolExecutor(max_workers=settings.cpu_pool_processes)
+    return _processes
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_thread_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # fn and its arguments must be picklable when a process pool is configured
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_cpu_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_workers() -> None:
+    global _threads, _processes
+    if _threads is not None:
+        _threads.shutdown(wait=False, cancel_futures=True)
+        _threads = None
+    if _processes is not None:
+        _processes.shutdown(wait=False, cancel_futures=True)
+        _processes = None
\ No newline at end of file
@@ -0,0 +1,416 @@
+"""Offline benchmark for the report pipeline against local upstream stand-ins.
+
+    python -m bench.run                                  # every scenario
+    python -m bench.run --scenario cold --iterations 10
+    python -m bench.run --scenario concurrent --users 16 --errors openai=0.05
+    python -m bench.run --json bench.json                # save results
+    python -m bench.run --baseline bench.json            # exit 1 on regressions
+
+Each report runs assemble_company_report, render_report_html, the asset
+load (prefetched logos come from cache) and html_to_pdf as separate
+stages; the spans recorded inside them (sources, LLM packing/completions)
+are reported as well. Latency
+percentiles are in milliseconds; peak RSS covers this process and its
+render workers while a stage was running.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+import httpx
+import numpy as np
+import pandas as pd
+from . import stubs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    users: int = 1
+    warm: bool = False
+    expected_pages: int = 4
+    reference_urls: int = 0
+    pages: Optional[int] = None  # stub overrides
+    page_kb: Optional[int] = None
+
+
+SCENARIOS = {
+    "cold": Scenario("cold", "one user, a new company every report: every source, page and completion fetched"),
+    "warm": Scenario("warm", "one user, the same company every report: research and LLM caches hit", warm=True),
+    "concurrent": Scenario("concurrent", "several users at once, each on new companies", users=8),
+    "large": Scenario("large", "12-page reports with 20 reference URLs and large web pages",
+                      expected_pages=12, reference_urls=20, pages=40, page_kb=64),
+}
+
+STAGES = ("assemble", "render_html", "assets", "html_to_pdf", "report")
+
+
+def _rss_bytes(exclude: int) -> int:
+    # Linux: this process plus its children (render workers); elsewhere the peak so far
+    try:
+        pids = [os.getpid()]
+        for tid in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{tid}/children") as f:
+                pids += [int(p) for p in f.read().split() if int(p) != exclude]
+        total = 0
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except OSError:
+                continue
+        return total
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class Recorder:
+    """Stage durations, errors and the peak RSS sampled while each stage was active."""
+
+    def __init__(self, exclude_pid: int, interval: float = 0.01):
+        self.samples: Dict[str, List[float]] = {}
+        self.spans: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.peak_rss: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._exclude = exclude_pid
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def __enter__(self) -> "Recorder":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        rss = _rss_bytes(self._exclude)
+        with self._lock:
+            for name, active in self._active.items():
+                if active:
+                    self.peak_rss[name] = max(self.peak_rss.get(name, 0), rss)
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+        self._sample()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            raise
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - start)
+            self._sample()
+            with self._lock:
+                self._active[name] -= 1
+
+    def add_spans(self, timings: Dict[str, float]) -> None:
+        for name, seconds in timings.items():
+            self.spans.setdefault(name, []).append(seconds)
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(samples), "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1), "mean_ms": round(float(values.mean()), 1),
+            "max_ms": round(float(values.max()), 1)}
+
+
+class _StubDDGS:
+    """duckduckgo_search.DDGS against the search stub."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def __enter__(self) -> "_StubDDGS":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def text(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        resp = httpx.get(f"{self.base_url}/search", params={"q": query, "max_results": max_results}, timeout=10)
+        resp.raise_for_status()
+        return resp.json()["results"]
+
+
+class _StubTicker:
+    """yfinance.Ticker against the finance stub: income_stmt is a metrics x fiscal-year-end frame."""
+
+    def __init__(self, base_url: str, symbol: str):
+        self.base_url = base_url
+        self.symbol = symbol
+
+    @property
+    def income_stmt(self) -> pd.DataFrame:
+        resp = httpx.get(f"{self.base_url}/finance/{self.symbol}", timeout=10)
+        resp.raise_for_status()
+        frame = pd.DataFrame(resp.json()).T.astype("float64")
+        frame.columns = pd.to_datetime(frame.columns)
+        return frame
+
+
+class StubProcess:
+    def __init__(self, config: stubs.StubConfig, ports: Dict[str, int]):
+        self.urls = stubs.base_urls(ports)
+        # spawn: the stubs get their own interpreter, so they don't compete for this one's GIL
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=stubs.serve, args=(config, ports), daemon=True
+        )
+
+    def start(self) -> None:
+        self.process.start()
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"{self.urls['pages']}/_stats", timeout=1).raise_for_status()
+                return
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        raise RuntimeError("benchmark stubs did not start")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return httpx.get(f"{self.urls['pages']}/_stats", timeout=5).json()
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.join(5)
+
+
+async def _one_report(recorder: Recorder, company: str, scenario: Scenario, reference_urls: List[str]) -> bool:
+    from app.report.pdf import html_to_pdf, render_report_html
+    from app.services.assemble_report import assemble_company_report
+    from app.utils.assets import load_assets, remote_assets
+    from app.utils.metrics import track_timings
+
+    try:
+        with track_timings() as timings, recorder.stage("report"):
+            with recorder.stage("assemble"):
+                report = await assemble_company_report(company, scenario.expected_pages,
+                                                       "Software growth and international expansion",
+                                                       reference_urls)
+            with recorder.stage("render_html"):
+                html = render_report_html(report)
+            with recorder.stage("assets"):
+                assets = await load_assets(remote_assets(html))
+            with recorder.stage("html_to_pdf"):
+                await html_to_pdf(html, assets)
+    except Exception:
+        return False
+    finally:
+        recorder.add_spans(timings)
+    return True
+
+
+async def run_scenario(scenario: Scenario, iterations: int, stub: StubProcess) -> Dict[str, Any]:
+    from app.utils.http import close_http_client
+
+    run_id = uuid.uuid4().hex[:6]
+    companies = {
+        user: f"Benchmark Automation {run_id} U{user}" for user in range(scenario.users)
+    }
+
+    def _company(user: int, i: int) -> str:
+        return companies[user] if scenario.warm else f"{companies[user]} R{i}"
+
+    def _reference_urls(company: str) -> List[str]:
+        slug = stubs.slugify(company)
+        return [f"{stub.urls['pages']}/pages/{slug}/{n}.html" for n in range(scenario.reference_urls)]
+
+    with Recorder(exclude_pid=stub.process.pid) as recorder:
+        if scenario.warm:
+            # Unmeasured pass that fills the research, page and LLM caches
+            warmup = Recorder(exclude_pid=stub.process.pid)
+            await asyncio.gather(*(_one_report(warmup, c, scenario, _reference_urls(c)) for c in companies.values()))
+
+        async def _user(user: int) -> int:
+            ok = 0
+            for i in range(iterations):
+                company = _company(user, i)
+                ok += await _one_report(recorder, company, scenario, _reference_urls(company))
+            return ok
+
+        started = time.perf_counter()
+        done = sum(await asyncio.gather(*(_user(u) for u in range(scenario.users))))
+        wall = time.perf_counter() - started
+    await close_http_client()
+
+    total = scenario.users * iterations
+    return {
+        "scenario": scenario.name,
+        "description": scenario.description,
+        "users": scenario.users,
+        "reports": total,
+        "failed": total - done,
+        "wall_seconds": round(wall, 2),
+        "reports_per_minute": round(done / wall * 60, 2) if wall else 0.0,
+        "stages": {
+            name: {**_summary(recorder.samples[name]), "errors": recorder.errors.get(name, 0),
+                   "peak_rss_mb": round(recorder.peak_rss.get(name, 0) / 2 ** 20, 1)}
+            for name in STAGES if name in recorder.samples
+        },
+        "spans": {name: _summary(values) for name, values in sorted(recorder.spans.items())},
+        "upstreams": stub.stats(),
+    }
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    print(f"\n== {result['scenario']}: {result['description']}")
+    print(f"   {result['reports']} reports ({result['failed']} failed) by {result['users']} user(s) in "
+          f"{result['wall_seconds']}s -> {result['reports_per_minute']} reports/min")
+    header = f"   {'stage':<28}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'err':>5}{'rss MB':>9}"
+    print(header)
+    for name, s in result["stages"].items():
+        print(f"   {name:<28}{s['count']:>5}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}"
+              f"{s['max_ms']:>10}{s['errors']:>5}{s['peak_rss_mb']:>9}")
+    for name, s in result["spans"].items():
+        print(f"     {name:<26}{s['count']:>5}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    calls = ", ".join(f"{name} {c['calls']}" + (f" ({c['errors']} failed)" if c["errors"] else "")
+                      for name, c in result["upstreams"].items() if c["calls"])
+    print(f"   upstream calls: {calls or 'none'}")
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Stage p95 latencies and throughput that got worse than the baseline by more than tolerance."""
+    previous = {r["scenario"]: r for r in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result["scenario"])
+        if base is None:
+            continue
+        for name, s in result["stages"].items():
+            before = base["stages"].get(name, {}).get("p95_ms")
+            if before and s["p95_ms"] > before * (1 + tolerance):
+                regressions.append(f"{result['scenario']}/{name}: p95 {before}ms -> {s['p95_ms']}ms")
+        before = base.get("reports_per_minute")
+        if before and result["reports_per_minute"] < before * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: {before} -> {result['reports_per_minute']} reports/min")
+    return regressions
+
+
+def _install_library_stubs(urls: Dict[str, str]) -> None:
+    # DuckDuckGo and Yahoo Finance are reached through client libraries with no base URL setting
+    from app.sources import finance
+    from app.utils import search
+
+    search.duckduckgo_search = SimpleNamespace(DDGS=partial(_StubDDGS, urls["search"]))
+    finance.yf = SimpleNamespace(Ticker=partial(_StubTicker, urls["finance"]))
+
+
+async def _run(args: argparse.Namespace, scenarios: List[Scenario], ports: Dict[str, int]) -> List[Dict[str, Any]]:
+    from app.report.pdf import init_renderer, shutdown_renderer
+    from app.sources.llm import close_openai_client
+    from app.utils.http import close_http_client, init_http_client
+    from app.utils.workers import shutdown_workers
+
+    await init_http_client()
+    init_renderer()
+    results = []
+    try:
+        for scenario in scenarios:
+            config = stubs.config_from_args(args)
+            config = replace(config, pages=scenario.pages or config.pages, page_kb=scenario.page_kb or config.page_kb)
+            # Fresh stubs per scenario, so upstream counts are per scenario
+            stub = StubProcess(config, ports)
+            stub.start()
+            try:
+                result = await run_scenario(scenario, args.iterations, stub)
+            finally:
+                await close_openai_client()
+                stub.stop()
+            _print_result(result)
+            results.append(result)
+    finally:
+        await close_http_client()
+        await close_openai_client()
+        shutdown_workers()
+        shutdown_renderer()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the report pipeline")
+    parser.add_argument("--scenario", action="append", choices=[*SCENARIOS, "all"],
+                        help="scenario to run (repeatable; default all)")
+    parser.add_argument("--iterations", type=int, default=5, help="reports per user")
+    parser.add_argument("--users", type=int, help="concurrent users for the concurrent scenario")
+    parser.add_argument("--llm-mode", choices=["sections", "single", "off"], default="single")
+    parser.add_argument("--render-workers", type=int, help="PDF render processes (default: app setting)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with results saved by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    parser.add_argument("--keep-cache", action="store_true", help="keep the temporary cache directory")
+    stubs.add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    names = args.scenario or ["all"]
+    scenarios = [SCENARIOS[n] for n in SCENARIOS] if "all" in names else [SCENARIOS[n] for n in dict.fromkeys(names)]
+    if args.users:
+        scenarios = [replace(s, users=args.users) if s.name == "concurrent" else s for s in scenarios]
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    ports = dict(zip(stubs.UPSTREAMS, stubs.free_ports(len(stubs.UPSTREAMS))))
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    # Settings are read when app is first imported, so the environment goes first
+    os.environ.update(stubs.app_environment(stubs.base_urls(ports)))
+    os.environ.update({"CACHE_DIR": cache_dir, "METRICS_ENABLED": "true"})
+    if args.llm_mode == "off":
+        os.environ.pop("OPENAI_API_KEY")
+    else:
+        os.environ["LLM_MODE"] = args.llm_mode
+    if args.render_workers:
+        os.environ["RENDER_WORKERS"] = str(args.render_workers)
+    _install_library_stubs(stubs.base_urls(ports))
+
+    try:
+        results = asyncio.run(_run(args, scenarios, ports))
+    finally:
+        if not args.keep_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,415 @@
+"""Local stand-ins for the research upstreams, serving recorded fixtures.
+
+Fixtures are templated per company ($company, $slug, $qid, $symbol), so any
+title resolves and every new title is a cold cache miss. Each upstream
+gets latency (gaussian, in ms) and an error rate. Run standalone with
+``python -m bench.stubs`` to point a dev server at them.
+"""
+from dataclasses import dataclass, field, replace
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import socket
+import time
+import zlib
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from PIL import Image
+import uvicorn
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+UPSTREAMS = ("wikipedia", "wikidata", "sparql", "news", "search", "finance", "openai", "pages", "assets")
+
+# Mean and jitter (ms) roughly matching what the live services show from a cloud region
+DEFAULT_LATENCY = {
+    "wikipedia": (120.0, 40.0),
+    "wikidata": (150.0, 50.0),
+    "sparql": (450.0, 150.0),
+    "news": (200.0, 60.0),
+    "search": (350.0, 120.0),
+    "finance": (300.0, 100.0),
+    "openai": (600.0, 200.0),
+    "pages": (150.0, 80.0),
+    "assets": (100.0, 30.0),
+}
+
+
+@dataclass
+class Fault:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+@dataclass
+class StubConfig:
+    faults: Dict[str, Fault] = field(
+        default_factory=lambda: {name: Fault(*DEFAULT_LATENCY[name]) for name in UPSTREAMS}
+    )
+    pages: int = 12  # distinct web pages per company
+    page_kb: int = 8  # approximate HTML size per page
+    page_max_age: int = 3600
+    llm_words_per_second: float = 80.0  # completion speed after the first token
+    logo_px: Tuple[int, int] = (1200, 400)
+    asset_base_url: str = ""  # set by serve()
+    seed: int = 7
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def slugify(company: str) -> str:
+    return re.sub(r"[^a-z0-9-]", "", company.lower().replace(" ", "-"))
+
+
+def qid_for(company: str) -> str:
+    return f"Q{100000 + zlib.crc32(company.encode()) % 9000000}"
+
+
+def symbol_for(company: str) -> str:
+    letters = re.sub(r"[^A-Z]", "", company.upper())[:3] or "CO"
+    return f"{letters}{zlib.crc32(company.encode()) % 100}"
+
+
+def _values(company: str, escape_json: bool) -> Dict[str, str]:
+    name = json.dumps(company)[1:-1] if escape_json else company
+    return {"company": name, "slug": slugify(company), "qid": qid_for(company), "symbol": symbol_for(company)}
+
+
+def _logo(size: Tuple[int, int]) -> bytes:
+    # Oversized transparent PNG, like the originals logo URLs often point at instead of a thumbnail
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    img.paste((11, 31, 68, 255), (0, size[1] // 4, size[0] // 3, size[1] * 3 // 4))
+    img.paste((59, 130, 246, 255), (size[0] // 3, 0, size[0], size[1] // 2))
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    return out.getvalue()
+
+
+class Stubs:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.article = Template(_fixture("article.html"))
+        self.sparql = Template(_fixture("sparql.json"))
+        self.news = Template(_fixture("news.json"))
+        self.page = Template(_fixture("page.html"))
+        self.income_stmt = json.loads(_fixture("income_stmt.json"))
+        self.paragraphs = json.loads(_fixture("paragraphs.json"))
+        self.logo = _logo(config.logo_px)
+        self.companies: Dict[str, str] = {}  # qid -> title, so SPARQL rows match the article
+        self.counters: Dict[str, Dict[str, int]] = {name: {"calls": 0, "errors": 0} for name in UPSTREAMS}
+
+    async def inject(self, upstream: str) -> Optional[Response]:
+        fault = self.config.faults.get(upstream) or Fault()
+        counter = self.counters[upstream]
+        counter["calls"] += 1
+        delay = max(0.0, self.random.gauss(fault.latency_ms, fault.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if fault.error_rate and self.random.random() < fault.error_rate:
+            counter["errors"] += 1
+            return JSONResponse({"error": f"injected {upstream} failure"}, status_code=503)
+        return None
+
+    def text(self, company: str, words: int, offset: int = 0) -> str:
+        out: List[str] = []
+        count = 0
+        i = offset
+        while count < words:
+            paragraph = Template(self.paragraphs[i % len(self.paragraphs)]).safe_substitute(company=company)
+            out.append(paragraph)
+            count += len(paragraph.split())
+            i += 1
+        return "\n\n".join(out)
+
+    def wikipedia(self, params: Dict[str, str]) -> Dict[str, Any]:
+        if params.get("action") == "query":
+            query = params.get("srsearch", "")
+            return {"query": {"search": [
+                {"title": query.title(), "snippet": f"<span class=\"searchmatch\">{query}</span> is an automation company"},
+                {"title": f"{query.title()} (disambiguation)", "snippet": "may refer to"},
+            ]}}
+        company = params.get("page", "")
+        self.companies[qid_for(company)] = company
+        return {"parse": {
+            "title": company,
+            "pageid": zlib.crc32(company.encode()),
+            "text": self.article.safe_substitute(_values(company, escape_json=False),
+                                                 asset_base=self.config.asset_base_url),
+            "properties": {"wikibase_item": qid_for(company)},
+        }}
+
+    def wikidata(self, params: Dict[str, str]) -> Dict[str, Any]:
+        titles = params.get("titles", "").split("|")
+        entities = {}
+        for title in titles:
+            self.companies[qid_for(title)] = title
+            entities[qid_for(title)] = {"type": "item", "id": qid_for(title)}
+        return {"entities": entities}
+
+    def sparql_results(self, query: str) -> Dict[str, Any]:
+        bindings = []
+        for qid in re.findall(r"wd:(Q\d+)", query):
+            company = self.companies.get(qid, qid)
+            rows = json.loads(self.sparql.safe_substitute(_values(company, escape_json=True)))
+            for row in rows:
+                binding = {
+                    "item": {"type": "uri", "value": f"http://www.wikidata.org/entity/{qid}"},
+                    "field": {"type": "literal", "value": row["field"]},
+                }
+                if "value" in row:
+                    binding["value"] = {"type": "literal", "value": row["value"]}
+                for name in ("valueLabel", "exchangeLabel", "ticker"):
+                    if name in row:
+                        binding[name] = {"type": "literal", "value": row[name]}
+                if row["field"] == "listing":
+                    binding["value"] = {"type": "uri", "value": f"http://www.wikidata.org/entity/statement/{qid}-1"}
+                bindings.append(binding)
+        return {"head": {"vars": ["item", "field", "value", "valueLabel", "exchangeLabel", "ticker"]},
+                "results": {"bindings": bindings}}
+
+    def search_results(self, base_url: str, query: str, max_results: int) -> Dict[str, Any]:
+        # Queries for one company share its page pool, so results overlap like real searches do
+        company = re.sub(r"\s+(about|leadership|products|revenue|strategy|values|glassdoor( reviews)?)$", "",
+                         query, flags=re.IGNORECASE)
+        start = zlib.crc32(query.lower().encode()) % self.config.pages
+        picks = [(start + i * 5) % self.config.pages for i in range(max_results)]
+        return {"results": [
+            {"title": f"{company} page {n}", "href": f"{base_url}/pages/{slugify(company)}/{n}.html",
+             "body": f"{company} ..."}
+            for n in dict.fromkeys(picks)
+        ]}
+
+    def page_html(self, slug: str, number: int) -> str:
+        company = slug.replace("-", " ").title()
+        words = max(50, self.config.page_kb * 1024 // 7)
+        paragraphs = self.text(company, words, offset=number).split("\n\n")
+        body = "\n".join(f"<p>{p}</p>" for p in paragraphs)
+        return self.page.safe_substitute(company=company, title=f"{company} page {number}", body=body)
+
+    def section_content(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        words = int(user.get("target_words") or 150)
+        offset = zlib.crc32(user.get("section", "").encode())
+        return {"content": self.text(user.get("company", ""), words, offset),
+                "sources": [d["url"] for d in user.get("documents", [])[:3]]}
+
+    def report_payload(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        company = user.get("company", "")
+        words = max(80, int(user.get("expected_pages") or 4) * 400 // max(1, len(user.get("section_guidance", []))))
+        sections = [
+            {"title": guidance.split(":")[0].split("(")[0].strip().capitalize(),
+             "content": self.text(company, words, i), "sources": [d["url"] for d in user.get("documents", [])[:2]]}
+            for i, guidance in enumerate(user.get("section_guidance", []))
+        ]
+        return {"company_title": company, "industry": "Industrial automation", "location": "Phoenix, Arizona",
+                "leaders": ["Morgan Lee (CEO)", "Dana Ortiz (Chair)"], "products": ["Motion controllers"],
+                "sections": sections, "peers": [], "references": [d["url"] for d in user.get("documents", [])]}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(c) for name, c in self.counters.items()}
+
+
+def _usage(messages: List[Dict[str, str]], completion: str) -> Dict[str, int]:
+    prompt = sum(len(m.get("content", "")) for m in messages) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": len(completion) // 4,
+            "total_tokens": prompt + len(completion) // 4}
+
+
+def build_app(config: StubConfig) -> FastAPI:
+    stubs = Stubs(config)
+    app = FastAPI()
+    app.state.stubs = stubs
+
+    @app.get("/wikipedia/w/api.php")
+    async def wikipedia(request: Request):
+        return await stubs.inject("wikipedia") or stubs.wikipedia(dict(request.query_params))
+
+    @app.get("/wikidata/w/api.php")
+    async def wikidata(request: Request):
+        return await stubs.inject("wikidata") or stubs.wikidata(dict(request.query_params))
+
+    @app.get("/sparql")
+    async def sparql(query: str = ""):
+        return await stubs.inject("sparql") or stubs.sparql_results(query)
+
+    @app.get("/news/v2/everything")
+    async def news(q: str = ""):
+        return await stubs.inject("news") or JSONResponse(json.loads(
+            stubs.news.safe_substitute(_values(q, escape_json=True))
+        ))
+
+    @app.get("/search")
+    async def search(request: Request, q: str = "", max_results: int = 3):
+        base_url = str(request.base_url).rstrip("/")
+        return await stubs.inject("search") or stubs.search_results(base_url, q, max_results)
+
+    @app.get("/finance/{symbol}")
+    async def finance(symbol: str):
+        return await stubs.inject("finance") or stubs.income_stmt
+
+    @app.get("/pages/{slug}/{number}.html")
+    async def page(slug: str, number: int):
+        failed = await stubs.inject("pages")
+        if failed:
+            return failed
+        return HTMLResponse(stubs.page_html(slug, number),
+                            headers={"Cache-Control": f"max-age={config.page_max_age}"})
+
+    @app.get("/assets/{name}")
+    async def asset(name: str):
+        return await stubs.inject("assets") or Response(stubs.logo, media_type="image/png",
+                                                        headers={"Cache-Control": "max-age=86400"})
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        failed = await stubs.inject("openai")
+        if failed:
+            return failed
+        user = json.loads(body["messages"][-1]["content"])
+        if not body.get("stream"):
+            content = json.dumps(stubs.section_content(user))
+            await asyncio.sleep(len(content.split()) / config.llm_words_per_second)
+            return {"id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": _usage(body["messages"], content)}
+
+        content = json.dumps(stubs.report_payload(user))
+
+        async def _chunks():
+            # About four words per chunk, paced at the configured completion speed
+            step = 24
+            for i in range(0, len(content), step):
+                chunk = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(4 / config.llm_words_per_second)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                final = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body["model"], "choices": [], "usage": _usage(body["messages"], content)}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_chunks(), media_type="text/event-stream")
+
+    @app.get("/_stats")
+    async def stats():
+        return stubs.stats()
+
+    return app
+
+
+def free_ports(count: int) -> List[int]:
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind(("127.0.0.1", 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def base_urls(ports: Dict[str, int]) -> Dict[str, str]:
+    return {name: f"http://127.0.0.1:{port}" for name, port in ports.items()}
+
+
+def serve(config: StubConfig, ports: Dict[str, int]) -> None:
+    """Serve every upstream on its own port: the app limits connections per host."""
+    config = replace(config, asset_base_url=base_urls(ports)["assets"])
+    sockets = []
+    for port in ports.values():
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("127.0.0.1", port))
+        sockets.append(s)
+    server = uvicorn.Server(uvicorn.Config(build_app(config), log_level="warning", access_log=False))
+    server.run(sockets=sockets)
+
+
+def parse_faults(latency: List[str], errors: List[str], scale: float = 1.0) -> Dict[str, Fault]:
+    """--latency name=mean[,jitter] (ms) and --errors name=rate; "all" applies to every upstream."""
+    faults = {name: Fault(mean * scale, jitter * scale) for name, (mean, jitter) in DEFAULT_LATENCY.items()}
+
+    def _targets(name: str) -> List[str]:
+        if name == "all":
+            return list(UPSTREAMS)
+        if name not in UPSTREAMS:
+            raise argparse.ArgumentTypeError(f"unknown upstream {name!r} (choose from {', '.join(UPSTREAMS)})")
+        return [name]
+
+    for spec in latency:
+        name, _, value = spec.partition("=")
+        mean, _, jitter = value.partition(",")
+        for target in _targets(name):
+            faults[target].latency_ms = float(mean)
+            faults[target].jitter_ms = float(jitter or 0)
+    for spec in errors:
+        name, _, rate = spec.partition("=")
+        for target in _targets(name):
+            faults[target].error_rate = float(rate)
+    return faults
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", action="append", default=[], metavar="UPSTREAM=MS[,JITTER]",
+                        help="upstream latency in ms (repeatable; 'all' for every upstream)")
+    parser.add_argument("--errors", action="append", default=[], metavar="UPSTREAM=RATE",
+                        help="share of upstream requests answered with 503 (repeatable)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for the default latencies (0 for no injected latency)")
+    parser.add_argument("--pages", type=int, default=12, help="distinct web pages per company")
+    parser.add_argument("--page-kb", type=int, default=8, help="approximate size of each web page")
+    parser.add_argument("--llm-wps", type=float, default=80.0, help="LLM completion speed in words per second")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        faults=parse_faults(args.latency, args.errors, args.latency_scale),
+        pages=args.pages,
+        page_kb=args.page_kb,
+        llm_words_per_second=args.llm_wps,
+        seed=args.seed,
+    )
+
+
+def app_environment(urls: Dict[str, str]) -> Dict[str, str]:
+    # Settings that point the app at the stubs; DuckDuckGo and Yahoo Finance
+    # are libraries without a base URL and are swapped in by bench.run
+    return {
+        "WIKIPEDIA_API_URL": f"{urls['wikipedia']}/wikipedia/w/api.php",
+        "WIKIDATA_API_URL": f"{urls['wikidata']}/wikidata/w/api.php",
+        "WIKIDATA_SPARQL_URL": f"{urls['sparql']}/sparql",
+        "NEWSAPI_URL": f"{urls['news']}/news/v2/everything",
+        "NEWSAPI_KEY": "bench",
+        "OPENAI_BASE_URL": f"{urls['openai']}/openai/v1",
+        "OPENAI_API_KEY": "bench",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the benchmark upstream stand-ins")
+    add_stub_arguments(parser)
+    parser.add_argument("--port", type=int, default=8900, help="first port; upstreams use consecutive ports")
+    args = parser.parse_args()
+    ports = {name: args.port + i for i, name in enumerate(UPSTREAMS)}
+    for name, value in app_environment(base_urls(ports)).items():
+        print(f"{name}={value}")
+    serve(config_from_args(args), ports)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file